@@ -12,6 +12,8 @@ import HistoryView from './components/history/HistoryView';
 import ScheduleSummary from './components/layout/ScheduleSummary';
 import Footer from './components/layout/Footer';
 import { useHistoryLog } from './hooks/useHistoryLog';
+import { usePullProgress } from './hooks/usePullProgress';
+import { useServerEvents } from './hooks/useServerEvents';
 import { useTheme } from './hooks/useTheme';
 import { version as appVersion } from '../package.json';
 
@@ -19,6 +21,7 @@ const POLL_INTERVAL_MS = 30000;
 const HISTORY_POLL_INTERVAL_MS = 60000;
 
 function App() {
+  const events = useServerEvents();
   const {
     containers,
     loading: containersLoading,
@@ -28,7 +31,7 @@ function App() {
     update,
     updateAll,
     setExclusion,
-  } = useContainers(POLL_INTERVAL_MS);
+  } = useContainers(POLL_INTERVAL_MS, events);
 
   const {
     settings,
@@ -39,20 +42,31 @@ function App() {
   const {
     schedule,
     error: scheduleError,
-  } = useSchedule(POLL_INTERVAL_MS);
+    cancel: cancelScan,
+  } = useSchedule(POLL_INTERVAL_MS, events);
   const {
     entries: historyEntries,
     loading: historyLoading,
+    loadingMore: historyLoadingMore,
     error: historyError,
+    filters: historyFilters,
+    setFilters: setHistoryFilters,
+    total: historyTotal,
+    totalExact: historyTotalExact,
+    hasMore: historyHasMore,
+    loadMore: loadMoreHistory,
     refresh: refreshHistory,
     clear: clearHistory,
-  } = useHistoryLog(HISTORY_POLL_INTERVAL_MS);
+  } = useHistoryLog(HISTORY_POLL_INTERVAL_MS, events);
+
+  const pulls = usePullProgress(events);
 
   const { theme, toggleTheme } = useTheme();
   const [activeView, setActiveView] = useState('dashboard');
   const [settingsOpen, setSettingsOpen] = useState(false);
   const [bulkUpdating, setBulkUpdating] = useState(false);
   const [bulkResult, setBulkResult] = useState(null);
+  const [bulkProgress, setBulkProgress] = useState(null);
 
   const formatDateLabel = (value) => {
     if (!value) return '';
@@ -65,13 +79,14 @@ function App() {
     setBulkUpdating(true);
     setBulkResult(null);
     try {
-      const result = await updateAll();
+      const result = await updateAll((job) => setBulkProgress(job));
       setBulkResult(result);
       refreshContainers();
     } catch (err) {
       setBulkResult({ error: err.message });
     } finally {
       setBulkUpdating(false);
+      setBulkProgress(null);
     }
   };
 
@@ -124,6 +139,8 @@ function App() {
               scheduleEnabled={!!settings?.auto_update_enabled}
               lastCheckLabel={scheduleError ? 'Error' : formatDateLabel(schedule.last_check_time)}
               nextCheckLabel={scheduleError ? 'Error' : formatDateLabel(schedule.next_check_time)}
+              scan={schedule.scan?.running}
+              onCancelScan={cancelScan}
             />
 
             {containersError ? (
@@ -151,7 +168,9 @@ function App() {
                       disabled={bulkUpdating || containersLoading}
                       className="inline-flex items-center justify-center px-4 py-2 rounded-md bg-indigo-600 text-white font-medium hover:bg-indigo-700 disabled:opacity-50 transition-colors"
                     >
-                      {bulkUpdating ? 'Checking & updating...' : 'Check & Update All'}
+                      {bulkUpdating
+                        ? `Checking & updating...${bulkProgress?.total ? ` (${bulkProgress.done}/${bulkProgress.total})` : ''}`
+                        : 'Check & Update All'}
                     </button>
                   </div>
 
@@ -203,6 +222,7 @@ function App() {
                   onUpdate={update}
                   onToggleExclusion={setExclusion}
                   bulkResult={bulkResult}
+                  pulls={pulls}
                 />
               </>
             ) : (
@@ -216,7 +236,14 @@ function App() {
           <HistoryView
             entries={historyEntries}
             loading={historyLoading}
+            loadingMore={historyLoadingMore}
             error={historyError}
+            filters={historyFilters}
+            onFiltersChange={setHistoryFilters}
+            total={historyTotal}
+            totalExact={historyTotalExact}
+            hasMore={historyHasMore}
+            onLoadMore={loadMoreHistory}
             onRefresh={refreshHistory}
             onClear={clearHistory}
             theme={theme}
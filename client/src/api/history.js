@@ -11,6 +11,18 @@ export async function getHistory(params = {}) {
   return request(`/history${qs}`);
 }
 
+// Cursor-paginated history: { items, next_cursor, prev_cursor, total, total_exact }.
+export async function getHistoryPage(params = {}) {
+  const query = new URLSearchParams();
+
+  ['limit', 'cursor', 'action', 'status', 'container', 'trigger', 'start', 'end'].forEach((key) => {
+    if (params[key]) query.append(key, params[key]);
+  });
+
+  const qs = query.toString() ? `?${query.toString()}` : '';
+  return request(`/history/page${qs}`);
+}
+
 export async function clearHistory() {
   return request('/history', { method: 'DELETE' });
 }
@@ -0,0 +1,15 @@
+import { request } from './http';
+
+const TERMINAL_STATES = ['succeeded', 'failed'];
+
+export const getJob = (id) => request(`/jobs/${id}`);
+
+// Poll a background job until it finishes, reporting each snapshot to onProgress.
+export async function waitForJob(id, { intervalMs = 1500, onProgress } = {}) {
+  for (;;) {
+    const job = await getJob(id);
+    onProgress?.(job);
+    if (TERMINAL_STATES.includes(job?.status)) return job;
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
@@ -0,0 +1,3 @@
+import { request } from './http';
+
+export const getPulls = () => request('/pulls');
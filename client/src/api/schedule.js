@@ -1,3 +1,5 @@
 import { request } from './http';
 
 export const getSchedule = () => request('/schedule');
+
+export const cancelScan = () => request('/schedule/cancel', { method: 'POST' });
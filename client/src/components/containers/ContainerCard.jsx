@@ -1,7 +1,47 @@
 import React, { useState, useEffect } from 'react';
 import { RefreshCw, Box, AlertCircle, CheckCircle } from 'lucide-react';
 
-const ContainerCard = ({ container, onCheckUpdate, onUpdate, onToggleExclusion, bulkStatus }) => {
+const formatBytes = (value) => {
+  if (!value) return '0 B';
+  const units = ['B', 'KB', 'MB', 'GB'];
+  const exponent = Math.min(Math.floor(Math.log(value) / Math.log(1024)), units.length - 1);
+  return `${(value / 1024 ** exponent).toFixed(exponent ? 1 : 0)} ${units[exponent]}`;
+};
+
+const PullProgress = ({ pull }) => {
+  const failed = ['failed', 'stalled', 'cancelled'].includes(pull.status);
+  const percent = pull.status === 'complete' ? 100 : pull.percent || 0;
+  const detail = failed
+    ? pull.error
+    : pull.status === 'complete'
+      ? 'Pull complete'
+      : pull.status === 'queued'
+        ? 'Queued'
+        : [
+          `${formatBytes(pull.bytes_done)} / ${formatBytes(pull.bytes_total)}`,
+          pull.throughput_bps ? `${formatBytes(pull.throughput_bps)}/s` : null,
+          pull.eta_seconds != null ? `ETA ${pull.eta_seconds}s` : null,
+        ].filter(Boolean).join(' · ');
+
+  return (
+    <div className="col-span-12">
+      <div className="mt-1 text-xs text-slate-600 dark:text-slate-300">
+        <div className="flex justify-between mb-1">
+          <span className="font-mono truncate">{pull.status === 'queued' ? 'Waiting to pull' : 'Pulling'} {pull.image}</span>
+          <span className={failed ? 'text-red-600 dark:text-red-300' : ''}>{detail}</span>
+        </div>
+        <div className="h-1.5 w-full rounded-full bg-slate-200 dark:bg-slate-800 overflow-hidden">
+          <div
+            className={`h-full rounded-full transition-all ${failed ? 'bg-red-500' : 'bg-indigo-500'}`}
+            style={{ width: `${percent}%` }}
+          />
+        </div>
+      </div>
+    </div>
+  );
+};
+
+const ContainerCard = ({ container, onCheckUpdate, onUpdate, onToggleExclusion, bulkStatus, pull }) => {
   const [checking, setChecking] = useState(false);
   const [updating, setUpdating] = useState(false);
   const [toggling, setToggling] = useState(false);
@@ -128,6 +168,8 @@ const ContainerCard = ({ container, onCheckUpdate, onUpdate, onToggleExclusion,
         </button>
       </div>
 
+      {pull ? <PullProgress pull={pull} /> : null}
+
       {updateStatus ? (
         <div className="col-span-12">
           <div
@@ -1,7 +1,7 @@
 import React from 'react';
 import ContainerCard from './ContainerCard';
 
-const ContainerGrid = ({ containers, onCheckUpdate, onUpdate, onToggleExclusion, bulkResult }) => {
+const ContainerGrid = ({ containers, onCheckUpdate, onUpdate, onToggleExclusion, bulkResult, pulls = {} }) => {
   const getBulkStatusForContainer = (containerId) => {
     if (!bulkResult?.results) return null;
     return bulkResult.results.find((r) => r.id === containerId);
@@ -24,6 +24,7 @@ const ContainerGrid = ({ containers, onCheckUpdate, onUpdate, onToggleExclusion,
             onUpdate={onUpdate}
             onToggleExclusion={onToggleExclusion}
             bulkStatus={getBulkStatusForContainer(container.id)}
+            pull={pulls[container.name]}
           />
         ))}
       </div>
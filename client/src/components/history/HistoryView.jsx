@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import {
   Activity,
   Clock3,
@@ -161,30 +161,91 @@ const HistorySection = ({ title, description, icon: Icon, entries, emptyMessage
   </section>
 );
 
-const HistoryView = ({ entries = [], loading, error, onRefresh, onClear, theme }) => {
+const STATUS_OPTIONS = ['updated', 'update_available', 'up_to_date', 'skipped', 'error'];
+const TRIGGER_OPTIONS = ['manual', 'auto'];
+
+const selectClass = `rounded-md border px-3 py-2 text-sm shadow-sm
+  border-gray-200 bg-white text-gray-700
+  dark:border-slate-800 dark:bg-slate-900 dark:text-slate-200`;
+
+const HistoryFilters = ({ filters, onChange }) => {
+  const [container, setContainer] = useState(filters.container || '');
+
+  // Only query the server once typing pauses.
+  useEffect(() => {
+    if ((filters.container || '') === container.trim()) return undefined;
+    const timer = setTimeout(() => onChange({ ...filters, container: container.trim() || undefined }), 400);
+    return () => clearTimeout(timer);
+  }, [container, filters, onChange]);
+
+  const update = (key) => (event) => onChange({ ...filters, [key]: event.target.value || undefined });
+
+  return (
+    <div className="flex flex-wrap items-center gap-2">
+      <input
+        type="text"
+        value={container}
+        onChange={(event) => setContainer(event.target.value)}
+        placeholder="Container name"
+        className={selectClass}
+      />
+      <select value={filters.status || ''} onChange={update('status')} className={selectClass}>
+        <option value="">All statuses</option>
+        {STATUS_OPTIONS.map((value) => (
+          <option key={value} value={value}>{value.replace(/_/g, ' ')}</option>
+        ))}
+      </select>
+      <select value={filters.trigger || ''} onChange={update('trigger')} className={selectClass}>
+        <option value="">All triggers</option>
+        {TRIGGER_OPTIONS.map((value) => (
+          <option key={value} value={value}>{value}</option>
+        ))}
+      </select>
+    </div>
+  );
+};
+
+const HistoryView = ({
+  entries = [],
+  loading,
+  loadingMore,
+  error,
+  filters = {},
+  onFiltersChange,
+  total,
+  totalExact = true,
+  hasMore,
+  onLoadMore,
+  onRefresh,
+  onClear,
+  theme,
+}) => {
   return (
     <div className="space-y-4">
-      <div className="flex flex-wrap items-center justify-end gap-2">
-        <button
-          onClick={onRefresh}
-          disabled={loading}
-          className="inline-flex items-center gap-2 rounded-md border px-3 py-2 text-sm font-medium shadow-sm transition-colors disabled:opacity-50
-            border-gray-200 bg-white text-gray-700 hover:bg-gray-50
-            dark:border-slate-800 dark:bg-slate-900 dark:text-slate-200 dark:hover:bg-slate-800"
-        >
-          <RefreshCw size={16} className={loading ? 'animate-spin' : ''} />
-          Refresh history
-        </button>
-        <button
-          onClick={onClear}
-          disabled={loading || entries.length === 0}
-          className="inline-flex items-center gap-2 rounded-md border px-3 py-2 text-sm font-medium shadow-sm transition-colors disabled:opacity-50
-            border-red-200 bg-red-50 text-red-700 hover:bg-red-100
-            dark:border-red-800 dark:bg-red-900/40 dark:text-red-100 dark:hover:bg-red-900/60"
-        >
-          <Eraser size={16} />
-          Clear history
-        </button>
+      <div className="flex flex-wrap items-center justify-between gap-2">
+        {onFiltersChange ? <HistoryFilters filters={filters} onChange={onFiltersChange} /> : <span />}
+        <div className="flex flex-wrap items-center gap-2">
+          <button
+            onClick={onRefresh}
+            disabled={loading}
+            className="inline-flex items-center gap-2 rounded-md border px-3 py-2 text-sm font-medium shadow-sm transition-colors disabled:opacity-50
+              border-gray-200 bg-white text-gray-700 hover:bg-gray-50
+              dark:border-slate-800 dark:bg-slate-900 dark:text-slate-200 dark:hover:bg-slate-800"
+          >
+            <RefreshCw size={16} className={loading ? 'animate-spin' : ''} />
+            Refresh history
+          </button>
+          <button
+            onClick={onClear}
+            disabled={loading || entries.length === 0}
+            className="inline-flex items-center gap-2 rounded-md border px-3 py-2 text-sm font-medium shadow-sm transition-colors disabled:opacity-50
+              border-red-200 bg-red-50 text-red-700 hover:bg-red-100
+              dark:border-red-800 dark:bg-red-900/40 dark:text-red-100 dark:hover:bg-red-900/60"
+          >
+            <Eraser size={16} />
+            Clear history
+          </button>
+        </div>
       </div>
 
       {error ? <ErrorBanner message={error} /> : null}
@@ -202,6 +263,26 @@ const HistoryView = ({ entries = [], loading, error, onRefresh, onClear, theme }
           emptyMessage="No update activity recorded yet."
         />
       )}
+
+      {entries.length > 0 ? (
+        <div className="flex items-center justify-between text-sm text-gray-600 dark:text-slate-300">
+          <span>
+            Showing {entries.length} of {total}{totalExact ? '' : '+'} entries
+          </span>
+          {hasMore ? (
+            <button
+              onClick={onLoadMore}
+              disabled={loadingMore}
+              className="inline-flex items-center gap-2 rounded-md border px-3 py-2 text-sm font-medium shadow-sm transition-colors disabled:opacity-50
+                border-gray-200 bg-white text-gray-700 hover:bg-gray-50
+                dark:border-slate-800 dark:bg-slate-900 dark:text-slate-200 dark:hover:bg-slate-800"
+            >
+              <RefreshCw size={16} className={loadingMore ? 'animate-spin' : ''} />
+              Load older
+            </button>
+          ) : null}
+        </div>
+      ) : null}
     </div>
   );
 };
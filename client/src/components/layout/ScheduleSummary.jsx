@@ -1,7 +1,53 @@
-import React from 'react';
-import { Clock3 } from 'lucide-react';
+import React, { useState } from 'react';
+import { Clock3, RefreshCw } from 'lucide-react';
 
-const ScheduleSummary = ({ scheduleEnabled, lastCheckLabel, nextCheckLabel }) => {
+const ScanProgress = ({ scan, onCancel }) => {
+  const [cancelling, setCancelling] = useState(false);
+  const [error, setError] = useState(null);
+
+  const handleCancel = async () => {
+    setCancelling(true);
+    setError(null);
+    try {
+      await onCancel();
+    } catch (err) {
+      setError(err.message || 'Failed to cancel scan');
+    } finally {
+      setCancelling(false);
+    }
+  };
+
+  const stopping = cancelling || scan.cancel_requested;
+
+  return (
+    <div className="flex items-center gap-3 text-slate-800 dark:text-slate-200">
+      <span className="inline-flex h-9 w-9 items-center justify-center rounded-md bg-slate-100 text-amber-500 dark:bg-slate-800 dark:text-amber-300">
+        <RefreshCw size={16} className="animate-spin" />
+      </span>
+      <div className="space-y-1">
+        <div className="text-[11px] uppercase tracking-[0.15em] text-slate-500 dark:text-slate-400">
+          Scan {scan.phase} · {Math.round(scan.elapsed_seconds || 0)}s
+        </div>
+        <div className="text-sm font-semibold">
+          {scan.done}/{scan.total}
+          {scan.current ? <span className="ml-2 font-normal text-slate-500 dark:text-slate-400">{scan.current}</span> : null}
+        </div>
+        {error ? <div className="text-xs text-red-600 dark:text-red-400">{error}</div> : null}
+      </div>
+      {onCancel ? (
+        <button
+          onClick={handleCancel}
+          disabled={stopping}
+          className="ml-2 rounded-md border border-slate-200 px-2 py-1 text-xs font-semibold text-slate-600 hover:bg-slate-100 disabled:opacity-50 dark:border-slate-700 dark:text-slate-300 dark:hover:bg-slate-800"
+        >
+          {stopping ? 'Stopping...' : 'Cancel'}
+        </button>
+      ) : null}
+    </div>
+  );
+};
+
+const ScheduleSummary = ({ scheduleEnabled, lastCheckLabel, nextCheckLabel, scan = null, onCancelScan }) => {
   const lastLabel = lastCheckLabel || '--';
   const nextLabel = nextCheckLabel || '--';
 
@@ -40,6 +86,13 @@ const ScheduleSummary = ({ scheduleEnabled, lastCheckLabel, nextCheckLabel }) =>
             <div className="text-sm font-semibold">{nextLabel}</div>
           </div>
         </div>
+
+        {scan ? (
+          <>
+            <span className="hidden h-10 w-px bg-slate-200 dark:bg-slate-800 sm:block" />
+            <ScanProgress scan={scan} onCancel={onCancelScan} />
+          </>
+        ) : null}
       </div>
     </div>
   );
@@ -6,10 +6,13 @@ import {
   updateAllContainers,
   setContainerExclusion,
 } from '../api/containers';
+import { waitForJob } from '../api/jobs';
 
 const DEFAULT_ERROR = 'Failed to fetch containers. Make sure the backend is running.';
 
-export function useContainers(pollIntervalMs = 30000) {
+// With a connected `events` channel (see useServerEvents) the list is kept
+// current from pushed changes; polling is only the fallback.
+export function useContainers(pollIntervalMs = 30000, events = null) {
   const [containers, setContainers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -35,10 +38,13 @@ export function useContainers(pollIntervalMs = 30000) {
     return result;
   }, [loadContainers]);
 
-  const updateAll = useCallback(async () => {
-    const result = await updateAllContainers();
+  // Bulk updates run as a server-side job; resolves with the finished job ({ results, summary, ... }).
+  const updateAll = useCallback(async (onProgress) => {
+    const queued = await updateAllContainers();
+    const job = await waitForJob(queued.id, { onProgress });
     await loadContainers();
-    return result;
+    if (job.status === 'failed') throw new Error(job.error || 'Bulk update failed');
+    return job;
   }, [loadContainers]);
 
   const setExclusion = useCallback(async (id, excluded) => {
@@ -47,11 +53,41 @@ export function useContainers(pollIntervalMs = 30000) {
     return result;
   }, [loadContainers]);
 
+  const live = !!events?.connected;
+
   useEffect(() => {
     loadContainers();
+    if (live) return undefined;
     const interval = setInterval(loadContainers, pollIntervalMs);
     return () => clearInterval(interval);
-  }, [loadContainers, pollIntervalMs]);
+  }, [loadContainers, pollIntervalMs, live]);
+
+  useEffect(() => {
+    if (!live) return undefined;
+    const unsubscribers = [
+      events.subscribe('container', (data) => {
+        if (data.action === 'remove') {
+          setContainers((prev) => prev.filter((c) => c.id !== data.id));
+          return;
+        }
+        const incoming = data.container;
+        setContainers((prev) => {
+          const index = prev.findIndex((c) => c.id === incoming.id);
+          if (index === -1) return [...prev, incoming];
+          const next = [...prev];
+          next[index] = incoming;
+          return next;
+        });
+      }),
+      events.subscribe('status', (data) => {
+        setContainers((prev) => prev.map((c) => (
+          c.name === data.name ? { ...c, update_status: data.status } : c
+        )));
+      }),
+      events.subscribe('reset', () => loadContainers()),
+    ];
+    return () => unsubscribers.forEach((unsubscribe) => unsubscribe());
+  }, [events, live, loadContainers]);
 
   return {
     containers,
@@ -1,24 +1,55 @@
-import { useCallback, useEffect, useState } from 'react';
-import { clearHistory, getHistory } from '../api/history';
+import { useCallback, useEffect, useRef, useState } from 'react';
+import { clearHistory, getHistoryPage } from '../api/history';
 
 const DEFAULT_ERROR = 'Failed to load history. Make sure the backend is reachable.';
+const PAGE_SIZE = 50;
+const FILTER_KEYS = ['container', 'status', 'trigger', 'action'];
 
-export function useHistoryLog(pollIntervalMs = 60000) {
+const matchesFilters = (entry, filters) =>
+  FILTER_KEYS.every((key) => !filters[key] || entry[key] === filters[key]);
+
+export function useHistoryLog(pollIntervalMs = 60000, events = null) {
   const [entries, setEntries] = useState([]);
+  const [filters, setFilters] = useState({});
+  const [nextCursor, setNextCursor] = useState(null);
+  const [total, setTotal] = useState(0);
+  const [totalExact, setTotalExact] = useState(true);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
+  const filtersRef = useRef(filters);
+  filtersRef.current = filters;
 
   const refresh = useCallback(async () => {
     setError(null);
     try {
-      const data = await getHistory();
-      setEntries(data || []);
+      const page = await getHistoryPage({ limit: PAGE_SIZE, ...filters });
+      setEntries(page?.items || []);
+      setNextCursor(page?.next_cursor || null);
+      setTotal(page?.total || 0);
+      setTotalExact(page?.total_exact ?? true);
     } catch (err) {
       setError(err.message || DEFAULT_ERROR);
     } finally {
       setLoading(false);
     }
-  }, []);
+  }, [filters]);
+
+  const loadMore = useCallback(async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    setError(null);
+    try {
+      const page = await getHistoryPage({ limit: PAGE_SIZE, cursor: nextCursor, ...filters });
+      const seen = new Set();
+      setEntries((prev) => [...prev, ...(page?.items || [])].filter((item) => !seen.has(item.id) && seen.add(item.id)));
+      setNextCursor(page?.next_cursor || null);
+    } catch (err) {
+      setError(err.message || DEFAULT_ERROR);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [filters, nextCursor]);
 
   const clear = useCallback(async () => {
     setLoading(true);
@@ -26,6 +57,8 @@ export function useHistoryLog(pollIntervalMs = 60000) {
     try {
       await clearHistory();
       setEntries([]);
+      setNextCursor(null);
+      setTotal(0);
     } catch (err) {
       setError(err.message || DEFAULT_ERROR);
     } finally {
@@ -33,16 +66,45 @@ export function useHistoryLog(pollIntervalMs = 60000) {
     }
   }, []);
 
+  const live = !!events?.connected;
+
   useEffect(() => {
+    setLoading(true);
     refresh();
+    if (live) return undefined;
     const interval = setInterval(refresh, pollIntervalMs);
     return () => clearInterval(interval);
-  }, [refresh, pollIntervalMs]);
+  }, [refresh, pollIntervalMs, live]);
+
+  useEffect(() => {
+    if (!live) return undefined;
+    const unsubscribers = [
+      events.subscribe('history', (entry) => {
+        if (!matchesFilters(entry, filtersRef.current)) return;
+        setEntries((prev) => [entry, ...prev.filter((item) => item.id !== entry.id)]);
+        setTotal((prev) => prev + 1);
+      }),
+      events.subscribe('history_cleared', () => {
+        setEntries([]);
+        setNextCursor(null);
+        setTotal(0);
+      }),
+      events.subscribe('reset', () => refresh()),
+    ];
+    return () => unsubscribers.forEach((unsubscribe) => unsubscribe());
+  }, [events, live, refresh]);
 
   return {
     entries,
     loading,
+    loadingMore,
     error,
+    filters,
+    setFilters,
+    total,
+    totalExact,
+    hasMore: !!nextCursor,
+    loadMore,
     refresh,
     clear,
   };
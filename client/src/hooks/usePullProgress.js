@@ -0,0 +1,87 @@
+import { useEffect, useState } from 'react';
+import { getPulls } from '../api/pulls';
+
+// How long a finished pull stays visible on its containers.
+const FINISHED_TTL_MS = 5000;
+const ACTIVE_STATUSES = ['queued', 'pulling'];
+// Polling cadence while the event stream is down.
+const POLL_INTERVAL_MS = 2000;
+
+const isRecent = (pull) =>
+  ACTIVE_STATUSES.includes(pull.status)
+  || (pull.finished_at && Date.now() - Date.parse(pull.finished_at) < FINISHED_TTL_MS);
+
+// Latest pull progress per container name, from `pull` server events,
+// or from polling /api/pulls when the event stream is not connected.
+export function usePullProgress(events = null) {
+  const [pulls, setPulls] = useState({});
+  const live = !!events?.connected;
+
+  useEffect(() => {
+    if (!live) return undefined;
+    const timers = new Set();
+
+    const apply = (pull) => {
+      setPulls((prev) => {
+        const next = { ...prev };
+        (pull.containers || []).forEach((name) => {
+          next[name] = pull;
+        });
+        return next;
+      });
+      if (!ACTIVE_STATUSES.includes(pull.status)) {
+        const timer = setTimeout(() => {
+          timers.delete(timer);
+          setPulls((prev) => {
+            const next = { ...prev };
+            (pull.containers || []).forEach((name) => {
+              if (next[name]?.id === pull.id) delete next[name];
+            });
+            return next;
+          });
+        }, FINISHED_TTL_MS);
+        timers.add(timer);
+      }
+    };
+
+    getPulls()
+      .then((list) => (list || []).filter((pull) => ACTIVE_STATUSES.includes(pull.status)).forEach(apply))
+      .catch(() => {});
+    const unsubscribe = events.subscribe('pull', apply);
+    return () => {
+      unsubscribe();
+      timers.forEach(clearTimeout);
+    };
+  }, [events, live]);
+
+  useEffect(() => {
+    if (live) return undefined;
+    let cancelled = false;
+
+    const poll = async () => {
+      try {
+        const list = await getPulls();
+        if (cancelled) return;
+        const next = {};
+        // Running pulls come first in the list, so walk it backwards to let them win.
+        [...(list || [])].reverse().filter(isRecent).forEach((pull) => {
+          (pull.containers || []).forEach((name) => {
+            next[name] = pull;
+          });
+        });
+        setPulls(next);
+      } catch {
+        // Keep the last known progress until the next poll.
+      }
+    };
+
+    poll();
+    const interval = setInterval(poll, POLL_INTERVAL_MS);
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+    };
+  }, [live]);
+
+  return pulls;
+}
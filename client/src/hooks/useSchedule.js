@@ -1,13 +1,14 @@
 import { useCallback, useEffect, useState } from 'react';
-import { getSchedule } from '../api/schedule';
+import { cancelScan, getSchedule } from '../api/schedule';
 
 const DEFAULT_SCHEDULE = {
   last_check_time: null,
   next_check_time: null,
   interval_minutes: null,
+  scan: null,
 };
 
-export function useSchedule(pollIntervalMs = 30000) {
+export function useSchedule(pollIntervalMs = 30000, events = null) {
   const [schedule, setSchedule] = useState(DEFAULT_SCHEDULE);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -25,11 +26,47 @@ export function useSchedule(pollIntervalMs = 30000) {
     }
   }, []);
 
+  const live = !!events?.connected;
+
   useEffect(() => {
     refresh();
+    if (live) return undefined;
     const interval = setInterval(refresh, pollIntervalMs);
     return () => clearInterval(interval);
-  }, [refresh, pollIntervalMs]);
+  }, [refresh, pollIntervalMs, live]);
+
+  useEffect(() => {
+    if (!live) return undefined;
+    return events.subscribe('scan', (data) => {
+      if (data.phase === 'finished' || (data.phase === 'checking' && !data.done)) {
+        refresh();
+        return;
+      }
+      // Progress events move the running scan along without a round trip.
+      setSchedule((prev) => {
+        const running = prev.scan?.running;
+        if (!running || running.id !== data.scan_id) return prev;
+        return {
+          ...prev,
+          scan: {
+            ...prev.scan,
+            running: {
+              ...running,
+              phase: data.phase ?? running.phase,
+              done: data.done ?? running.done,
+              total: data.total ?? running.total,
+              current: data.container ?? null,
+            },
+          },
+        };
+      });
+    });
+  }, [events, live, refresh]);
+
+  const cancel = useCallback(async () => {
+    await cancelScan();
+    await refresh();
+  }, [refresh]);
 
-  return { schedule, loading, error, refresh };
+  return { schedule, loading, error, refresh, cancel };
 }
@@ -0,0 +1,52 @@
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
+import { API_BASE } from '../api/http';
+
+const EVENT_TYPES = ['container', 'status', 'history', 'history_cleared', 'scan', 'pull', 'job', 'reset'];
+
+// One EventSource per tab. The browser reconnects on its own and sends
+// Last-Event-ID, so the server resumes from where the stream dropped.
+export function useServerEvents(enabled = true) {
+  const [connected, setConnected] = useState(false);
+  const handlersRef = useRef(new Map());
+
+  useEffect(() => {
+    if (!enabled || typeof EventSource === 'undefined') return undefined;
+
+    const source = new EventSource(`${API_BASE}/events`);
+    source.onopen = () => setConnected(true);
+    source.onerror = () => setConnected(false);
+
+    const listeners = EVENT_TYPES.map((type) => {
+      const listener = (event) => {
+        let data;
+        try {
+          data = JSON.parse(event.data);
+        } catch {
+          return;
+        }
+        (handlersRef.current.get(type) || []).forEach((handler) => handler(data));
+      };
+      source.addEventListener(type, listener);
+      return [type, listener];
+    });
+
+    return () => {
+      listeners.forEach(([type, listener]) => source.removeEventListener(type, listener));
+      source.close();
+      setConnected(false);
+    };
+  }, [enabled]);
+
+  const subscribe = useCallback((type, handler) => {
+    const handlers = handlersRef.current.get(type) || [];
+    handlersRef.current.set(type, [...handlers, handler]);
+    return () => {
+      handlersRef.current.set(
+        type,
+        (handlersRef.current.get(type) || []).filter((item) => item !== handler),
+      );
+    };
+  }, []);
+
+  return useMemo(() => ({ connected, subscribe }), [connected, subscribe]);
+}
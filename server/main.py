@@ -1,15 +1,37 @@
 import io
 import os
-from fastapi import FastAPI, HTTPException, Header
+import time
+import zlib
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 import docker
 import smtplib
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 from services.history import HistoryService
 
-app = FastAPI(title="Light House API", description="Docker Watchtower-like Monitor")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if inventory:
+        inventory.start()
+    scheduler.start()
+    try:
+        yield
+    finally:
+        jobs.shutdown()
+        # Records the rolled-up due check summary before history closes.
+        scheduler.stop()
+        if inventory:
+            inventory.stop()
+        status_cache.flush()
+        # Commits any history entries still queued for the background writer.
+        history_service.close()
+
+
+app = FastAPI(title="Light House API", description="Docker Watchtower-like Monitor", lifespan=lifespan)
 
 # CORS Configuration
 origins = [
@@ -45,6 +67,14 @@ class ContainerInfo(BaseModel):
     update_status: Optional[dict] = None
 
 
+class ContainerChanges(BaseModel):
+    generation: int
+    full: bool = False
+    added: List[ContainerInfo] = []
+    changed: List[ContainerInfo] = []
+    removed: List[str] = []
+
+
 class ContainerExclusion(BaseModel):
     excluded: bool
 
@@ -108,46 +138,124 @@ def extract_webhook_token(x_webhook_token: Optional[str], authorization: Optiona
     return ""
 
 
-@app.get("/api/containers", response_model=List[ContainerInfo])
-def list_containers():
+def build_container_info(attrs: dict) -> ContainerInfo:
+    """API view of one container from inventory inspect data (no daemon calls except a cold image LRU)."""
+    name = attrs["Name"].lstrip("/")
+    image_meta = image_cache.get(attrs["Image"])
+    tags = image_meta.get("RepoTags") or []
+    return ContainerInfo(
+        id=attrs["Id"],
+        short_id=attrs["Id"][:12],
+        name=name,
+        image=str(tags[0]) if tags else attrs["Image"],
+        status=attrs["State"]["Status"],
+        state=attrs["State"]["Status"],
+        created=attrs.get("Created") or image_meta.get("Created"),
+        excluded=settings_manager.is_excluded(name),
+        update_status=status_cache.get(name)
+    )
+
+
+def _conditional(response: Response, etag: str, generation: int, if_none_match: Optional[str]) -> Optional[Response]:
+    """Return a 304 when the client's validator matches; otherwise tag the response."""
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Generation"] = str(generation)
+    return None
+
+
+@app.get("/api/containers", response_model=Union[List[ContainerInfo], ContainerChanges])
+def list_containers(
+    response: Response,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+):
+    """
+    All containers, or with ?since=<generation> only those added, changed or
+    removed after it. Supports If-None-Match against the current generation.
+    """
     if not client:
         raise HTTPException(status_code=500, detail="Docker client not connected")
 
-    containers = []
+    generation = max(inventory.generation, status_cache.generation)
+    not_modified = _conditional(response, generations.etag("containers", generation), generation, if_none_match)
+    if not_modified:
+        return not_modified
+
     try:
-        # List all containers (running and stopped)
-        for c in client.containers.list(all=True):
-            containers.append(ContainerInfo(
-                id=c.id,
-                short_id=c.short_id,
-                name=c.name,
-                image=str(c.image.tags[0]) if c.image.tags else c.image.id,
-                status=c.status,
-                state=c.attrs['State']['Status'],
-                created=c.attrs.get('Created') or c.image.attrs.get('Created'),
-                excluded=settings_manager.is_excluded(c.name),
-                update_status=status_cache.get(c.name)
-            ))
+        if since is None:
+            # A memory read from the event-fed inventory; image tags come from the
+            # shared image-ID LRU instead of an inspect per container.
+            return [build_container_info(attrs) for attrs in inventory.list_attrs()]
+
+        changes = inventory.changes_since(since)
+        if not changes["full"]:
+            # Status-only changes surface as changed containers too.
+            seen = {attrs["Id"] for attrs in changes["added"] + changes["changed"]}
+            for name in status_cache.changed_since(since):
+                attrs = inventory.get_attrs(name)
+                if attrs and attrs["Id"] not in seen:
+                    changes["changed"].append(attrs)
+                    seen.add(attrs["Id"])
+        return ContainerChanges(
+            generation=generation,
+            full=changes["full"],
+            added=[build_container_info(attrs) for attrs in changes["added"]],
+            changed=[build_container_info(attrs) for attrs in changes["changed"]],
+            removed=changes["removed"],
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return containers
+
+def publish_container_change(action: str, attrs: Optional[dict]):
+    if action == "resync":
+        broker.publish("reset", {"reason": "Container inventory resynced"})
+    elif action == "remove":
+        broker.publish("container", {"action": "remove", "id": attrs["Id"], "name": attrs["Name"].lstrip("/")})
+    else:
+        broker.publish("container", {"action": "upsert", "container": jsonable_encoder(build_container_info(attrs))})
 
 
 from services.updater import UpdateService
 from services.notifications import NotificationService
 
-from services.cache import StatusCache
-status_cache = StatusCache()
-
 from services.settings import SettingsManager
 settings_manager = SettingsManager()
-history_service = HistoryService()
+
+from services.cache import ImageMetadataCache, StatusCache
+from services.events import EventBroker
+from services.generation import GenerationCounter
+from services.inventory import ContainerInventory
+from services.pulls import PullMonitor
+from services.cleanup import ImageCollector, RetainedContainers, retained_name
+from services.churn import observed_version
+broker = EventBroker()
+generations = GenerationCounter()
+status_cache = StatusCache(settings_manager=settings_manager, broker=broker, generations=generations)
+history_service = HistoryService(
+    max_entries=settings_manager.get("history_max_entries") or 100000,
+    broker=broker,
+    generations=generations,
+    backend=settings_manager.get("history_backend"),
+    settings_manager=settings_manager,
+)
 
 notifier = NotificationService(settings_manager)
-updater = UpdateService(settings_manager)
+image_cache = ImageMetadataCache(client) if client else None
+inventory = ContainerInventory(client, on_change=publish_container_change, generations=generations) if client else None
+pull_monitor = PullMonitor(client, settings_manager, broker) if client else None
+image_collector = ImageCollector(client, settings_manager, inventory) if client else None
+retained_containers = RetainedContainers(client, settings_manager, inventory) if client else None
+updater = UpdateService(settings_manager, image_cache=image_cache, pull_monitor=pull_monitor, image_collector=image_collector)
 from services.backup import SettingsBackup
 backup_service = SettingsBackup(settings_manager)
+from services.jobs import JobManager
+jobs = JobManager(broker=broker)
+from services.compose import BatchUpdater
+batch_updater = BatchUpdater(updater, settings_manager)
 
 
 @app.post("/api/containers/{container_id}/check-update")
@@ -165,7 +273,9 @@ def check_update(container_id: str):
         )
         return skipped
 
+    started = time.monotonic()
     result = updater.check_for_update(container_id)
+    result["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
     if result.get("error"):
         history_service.log_event(
             action="check_update",
@@ -173,9 +283,11 @@ def check_update(container_id: str):
             message=result.get("error"),
             container=container.name,
             trigger="manual",
+            details={"duration_ms": result["duration_ms"]},
         )
     else:
         status_cache.update(container.name, result)
+        scheduler.churn.observe(result.get("image"), observed_version(result))
         history_service.log_event(
             action="check_update",
             status="update_available" if result.get("update_available") else "up_to_date",
@@ -186,6 +298,9 @@ def check_update(container_id: str):
                 "image": result.get("image"),
                 "latest_id": result.get("latest_id"),
                 "current_id": result.get("current_id"),
+                "latest_digest": result.get("latest_digest"),
+                "check_mode": result.get("check_mode"),
+                "duration_ms": result["duration_ms"],
             },
         )
     return result
@@ -194,12 +309,10 @@ def check_update(container_id: str):
 from services.scheduler import SchedulerService
 
 # Pass updater to scheduler
-scheduler = SchedulerService(settings_manager, updater, status_cache, notifier, history_service)
-
-
-@app.on_event("startup")
-def start_scheduler():
-    scheduler.start()
+scheduler = SchedulerService(
+    settings_manager, updater, status_cache, notifier, history_service, inventory, broker,
+    collector=image_collector, retained=retained_containers,
+)
 
 
 @app.get("/api/settings")
@@ -212,9 +325,143 @@ def get_schedule():
     return scheduler.get_schedule_info()
 
 
+@app.post("/api/schedule/cancel")
+def cancel_scan():
+    scan = scheduler.cancel_scan()
+    if scan is None:
+        raise HTTPException(status_code=409, detail="No scan is running")
+    return {"cancelled": True, "scan": scan}
+
+
+@app.get("/api/events")
+def stream_events(
+    cursor: Optional[int] = None,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events: container, status, history and scan events as they happen.
+    Resume with the Last-Event-ID header (sent by EventSource on reconnect) or ?cursor=.
+    """
+    if cursor is None and last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(broker.stream(cursor), media_type="text/event-stream", headers=headers)
+
+
 @app.get("/api/history")
-def get_history(action: str = None, status: str = None, limit: int = 100):
-    return history_service.get_history(action=action, status=status, limit=limit)
+def get_history(
+    response: Response,
+    action: str = None,
+    status: str = None,
+    limit: int = 100,
+    since: Optional[int] = None,
+    container: Optional[str] = None,
+    trigger: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+):
+    """
+    Newest-first history, optionally for one container and an ISO-8601 time range
+    (`start` inclusive, `end` exclusive). With ?since=<generation> returns only newer
+    entries as {generation, reset, added}; `reset` means the cursor is stale and
+    `added` is a full page.
+    """
+    generation = history_service.generation
+    not_modified = _conditional(response, generations.etag("history", generation), generation, if_none_match)
+    if not_modified:
+        return not_modified
+
+    filters = {"action": action, "status": status, "limit": limit, "container": container, "trigger": trigger, "start": start, "end": end}
+    try:
+        if since is None:
+            return history_service.get_history(**filters)
+
+        reset = not generations.is_current(since) or since < history_service.cleared_generation
+        return {
+            "generation": generation,
+            "reset": reset,
+            "added": history_service.get_history(**filters, since=None if reset else since),
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+
+
+@app.get("/api/history/stats")
+def get_history_stats():
+    """
+    Rolling per-container (update frequency, failure rate, time since last update,
+    mean check latency), per-action and per-day aggregates, maintained as events
+    are logged rather than computed from the log.
+    """
+    return history_service.get_stats()
+
+
+def _gzip_chunks(chunks):
+    """Incrementally gzip a stream of text chunks."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@app.get("/api/history/export")
+def export_history(
+    request: Request,
+    format: str = "ndjson",
+    gzip: Optional[bool] = None,
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    container: Optional[str] = None,
+    trigger: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    """
+    Stream the matching history (oldest first) as NDJSON or CSV without loading it
+    into memory. The body is gzip-encoded when the client accepts gzip, or when
+    ?gzip=true; ?gzip=false turns compression off.
+    """
+    try:
+        chunks, media_type, filename = history_service.export(
+            format, action=action, status=status, container=container,
+            trigger=trigger, start=start, end=end,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if gzip is None:
+        gzip = "gzip" in (request.headers.get("accept-encoding") or "")
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        chunks = _gzip_chunks(chunks)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+@app.get("/api/history/page")
+def get_history_page(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    container: Optional[str] = None,
+    trigger: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    """
+    Cursor-paginated history, newest first: {items, next_cursor, prev_cursor, total, total_exact}.
+    Pass next_cursor to page to older entries and prev_cursor to page back to newer ones.
+    """
+    try:
+        return history_service.get_page(
+            limit=limit, cursor=cursor, action=action, status=status,
+            container=container, trigger=trigger, start=start, end=end,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.delete("/api/history")
@@ -227,6 +474,9 @@ def clear_history():
 def update_settings(new_settings: dict):
     updated = settings_manager.update(new_settings)
     scheduler.update_settings()
+    if inventory:
+        # Exclusions may have changed, which alters every container's payload.
+        inventory.touch()
     return updated
 
 
@@ -249,6 +499,25 @@ def validate_registry(creds: RegistryCredentials):
         raise HTTPException(status_code=400, detail=f"Registry authentication failed: {str(e)}")
 
 
+@app.get("/api/pulls")
+def list_pulls():
+    """Running and queued image pulls (bytes, throughput, ETA) followed by recently finished ones."""
+    return pull_monitor.active() if pull_monitor else []
+
+
+@app.get("/api/pulls/queue")
+def get_pull_queue():
+    """Pull queue occupancy against max_concurrent_pulls and the bandwidth budget."""
+    if not pull_monitor:
+        raise HTTPException(status_code=500, detail="Docker client not connected")
+    return pull_monitor.queue_info()
+
+
+@app.get("/api/registries/quota")
+def get_registry_quota():
+    return {"registries": updater.registry.quota()}
+
+
 @app.post("/api/notifications/validate")
 def validate_smtp(creds: SmtpCredentials):
     if not creds.host or not creds.port:
@@ -295,6 +564,8 @@ def import_settings(payload: SettingsImport):
     try:
         restored = backup_service.import_encrypted(payload.content, payload.password)
         scheduler.update_settings()
+        if inventory:
+            inventory.touch()
         return {"restored": True, "settings": restored}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -302,13 +573,23 @@ def import_settings(payload: SettingsImport):
         raise HTTPException(status_code=400, detail=f"Failed to import settings: {e}")
 
 
+def ensure_updatable(container):
+    if settings_manager.is_excluded(container.name):
+        raise HTTPException(status_code=400, detail="Updates are disabled for this container")
+    if retained_name(container.name):
+        raise HTTPException(status_code=400, detail="Retained previous containers cannot be updated")
+
+
 @app.post("/api/containers/{container_id}/update")
 def perform_update(container_id: str):
     container = get_container_or_404(container_id)
-    if settings_manager.is_excluded(container.name):
-        raise HTTPException(status_code=400, detail="Updates are disabled for this container")
+    ensure_updatable(container)
+    return apply_update(container)
+
 
-    result = updater.update_container(container_id)
+def apply_update(container, priority: str = "manual"):
+    """Update one container and record the outcome; `priority` is its pull queue class."""
+    result = updater.update_container(container.id, priority=priority)
     if not result.get("success"):
         try:
             notifier.send_update_notification(container.name, {**result, "success": False, "message": result.get("error", "Update failed")})
@@ -320,6 +601,7 @@ def perform_update(container_id: str):
             message=result.get("error", "Update failed"),
             container=container.name,
             trigger="manual",
+            details={"downtime_ms": result.get("downtime_ms"), "rolled_back": result.get("rolled_back")},
         )
         raise HTTPException(status_code=500, detail=result.get("error"))
     notifier.send_update_notification(container.name, result)
@@ -332,6 +614,7 @@ def perform_update(container_id: str):
         details={
             "new_id": result.get("new_id"),
             "image": container.attrs['Config'].get('Image'),
+            "downtime_ms": result.get("downtime_ms"),
         },
     )
     status_cache.update(container.name, {
@@ -341,10 +624,61 @@ def perform_update(container_id: str):
     return result
 
 
+@app.get("/api/containers/{container_id}/retained")
+def list_retained(container_id: str):
+    """Previous containers kept for rollback, newest first."""
+    container = get_container_or_404(container_id)
+    return retained_containers.list(container.name)
+
+
+@app.post("/api/containers/{container_id}/rollback")
+def rollback_container(container_id: str):
+    """Swap the most recent retained previous container back in; no registry access."""
+    container = get_container_or_404(container_id)
+    previous = retained_containers.latest(container.name)
+    if not previous:
+        raise HTTPException(status_code=404, detail="No retained previous container to roll back to")
+
+    result = updater.rollback_container(container.id, previous["id"])
+    if not result.get("success"):
+        history_service.log_event(
+            action="rollback",
+            status="error",
+            message=result.get("error", "Rollback failed"),
+            container=container.name,
+            trigger="manual",
+            details={"previous_id": previous["id"], "downtime_ms": result.get("downtime_ms"), "restored": result.get("restored")},
+        )
+        raise HTTPException(status_code=500, detail=result.get("error"))
+    history_service.log_event(
+        action="rollback",
+        status="updated",
+        message=result.get("message", "Rolled back"),
+        container=container.name,
+        trigger="manual",
+        details={"new_id": result.get("new_id"), "image": previous["image"], "downtime_ms": result.get("downtime_ms")},
+    )
+    # The restored container runs the older image; let the next check decide its status.
+    status_cache.remove(container.name)
+    return result
+
+
+@app.get("/api/disk-usage")
+def get_disk_usage(refresh: bool = False):
+    """Docker disk usage and what image cleanup can reclaim (cached `docker system df`)."""
+    if not image_collector:
+        raise HTTPException(status_code=500, detail="Docker client not connected")
+    try:
+        return image_collector.disk_usage(refresh=refresh)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/containers/{container_id}/exclusion")
 def set_container_exclusion(container_id: str, payload: ContainerExclusion):
     container = get_container_or_404(container_id)
     settings_manager.set_excluded(container.name, payload.excluded)
+    inventory.touch(container.id)
     return {
         "id": container.id,
         "name": container.name,
@@ -353,17 +687,78 @@ def set_container_exclusion(container_id: str, payload: ContainerExclusion):
     }
 
 
-@app.post("/api/containers/update-all")
-def update_all_containers():
-    if not client:
-        raise HTTPException(status_code=500, detail="Docker client not connected")
-
+def run_update_all(job):
+    """Check and update every non-excluded container, reporting each result to `job`."""
     results = []
-    for c in client.containers.list(all=True):
+
+    def record(result):
+        results.append(result)
+        job.add_result(result)
+
+    containers = [c for c in inventory.containers() if not retained_name(c.name)]
+    job.set_total(len(containers))
+    # One registry lookup per distinct image reference, shared by every container using it
+    lookups = {}
+    pending = []
+    check_times = {}
+
+    def record_update(c, check_result, update_result):
+        if update_result.get("success"):
+            record({
+                "id": c.id,
+                "name": c.name,
+                "status": "updated",
+                "message": update_result.get("message", "Updated successfully"),
+            })
+            notifier.send_update_notification(c.name, update_result)
+            status_cache.update(c.name, {
+                "update_available": False,
+                "current_id": check_result.get("latest_id"),
+                "latest_id": check_result.get("latest_id"),
+            })
+            history_service.log_event(
+                action="bulk_update",
+                status="updated",
+                message=update_result.get("message", "Updated successfully"),
+                container=c.name,
+                trigger="manual",
+                details={
+                    "image": check_result.get("image"),
+                    "new_id": update_result.get("new_id"),
+                    "duration_ms": check_times.get(c.id),
+                    "downtime_ms": update_result.get("downtime_ms"),
+                },
+            )
+        else:
+            try:
+                notifier.send_update_notification(c.name, {**update_result, "success": False, "message": update_result.get("error", "Update failed")})
+            except Exception:
+                pass
+            record({
+                "id": c.id,
+                "name": c.name,
+                "status": "error",
+                "message": update_result.get("error", "Update failed"),
+            })
+            history_service.log_event(
+                action="bulk_update",
+                status="error",
+                message=update_result.get("error", "Update failed"),
+                container=c.name,
+                trigger="manual",
+                details={
+                    "image": check_result.get("image"),
+                    "duration_ms": check_times.get(c.id),
+                    "downtime_ms": update_result.get("downtime_ms"),
+                    "rolled_back": update_result.get("rolled_back"),
+                },
+            )
+
+    for c in containers:
         name = c.name
         if settings_manager.is_excluded(name):
             reason = "Container excluded from updates"
-            results.append({
+            record({
                 "id": c.id,
                 "name": name,
                 "status": "skipped",
@@ -380,9 +775,14 @@ def update_all_containers():
             continue
 
         try:
-            check_result = updater.check_for_update(c.id)
+            image_name = c.attrs['Config']['Image']
+            started = time.monotonic()
+            if image_name not in lookups:
+                lookups[image_name] = updater.resolve_image(image_name, containers=[name], priority="update")
+            check_result = updater.check_container(c, lookups[image_name])
+            check_ms = round((time.monotonic() - started) * 1000, 1)
             if check_result.get("error"):
-                results.append({
+                record({
                     "id": c.id,
                     "name": name,
                     "status": "error",
@@ -399,13 +799,15 @@ def update_all_containers():
                     message=check_result.get("error"),
                     container=name,
                     trigger="manual",
+                    details={"duration_ms": check_ms},
                 )
                 continue
 
             status_cache.update(name, check_result)
+            scheduler.churn.observe(check_result.get("image"), observed_version(check_result))
 
             if not check_result.get("update_available"):
-                results.append({
+                record({
                     "id": c.id,
                     "name": name,
                     "status": "up_to_date",
@@ -418,53 +820,14 @@ def update_all_containers():
                     message="No updates found",
                     container=name,
                     trigger="manual",
-                    details={"image": check_result.get("image")},
+                    details={"image": check_result.get("image"), "duration_ms": check_ms},
                 )
                 continue
 
-            update_result = updater.update_container(c.id)
-            if update_result.get("success"):
-                results.append({
-                    "id": c.id,
-                    "name": name,
-                    "status": "updated",
-                    "message": update_result.get("message", "Updated successfully"),
-                })
-                notifier.send_update_notification(name, update_result)
-                status_cache.update(name, {
-                    "update_available": False,
-                    "current_id": check_result.get("latest_id"),
-                    "latest_id": check_result.get("latest_id"),
-                })
-                history_service.log_event(
-                    action="bulk_update",
-                    status="updated",
-                    message=update_result.get("message", "Updated successfully"),
-                    container=name,
-                    trigger="manual",
-                    details={"image": check_result.get("image"), "new_id": update_result.get("new_id")},
-                )
-            else:
-                try:
-                    notifier.send_update_notification(name, {**update_result, "success": False, "message": update_result.get("error", "Update failed")})
-                except Exception:
-                    pass
-                results.append({
-                    "id": c.id,
-                    "name": name,
-                    "status": "error",
-                    "message": update_result.get("error", "Update failed"),
-                })
-                history_service.log_event(
-                    action="bulk_update",
-                    status="error",
-                    message=update_result.get("error", "Update failed"),
-                    container=name,
-                    trigger="manual",
-                    details={"image": check_result.get("image")},
-                )
+            pending.append((c, check_result))
+            check_times[c.id] = check_ms
         except Exception as e:
-            results.append({
+            record({
                 "id": c.id,
                 "name": name,
                 "status": "error",
@@ -478,18 +841,48 @@ def update_all_containers():
                 trigger="manual",
             )
 
+    # Updates go by compose project: parallel pre-pull, then dependency-ordered recreates.
+    batch_updater.run(pending, containers, record_update)
+
     summary = {
         "updated": len([r for r in results if r["status"] == "updated"]),
         "up_to_date": len([r for r in results if r["status"] == "up_to_date"]),
         "skipped": len([r for r in results if r["status"] == "skipped"]),
         "errors": len([r for r in results if r["status"] == "error"]),
         "total": len(results),
+        "registry_lookups_saved": max(0, len([r for r in results if r["status"] != "skipped"]) - len(lookups)),
     }
 
-    return {"results": results, "summary": summary}
+    return summary
 
 
-@app.post("/api/webhook/update")
+@app.post("/api/containers/update-all", status_code=202)
+def update_all_containers():
+    """
+    Queue a bulk check-and-update run and return its job at once; poll
+    /api/jobs/{id} (or listen for `job` events) for progress and results.
+    Only one bulk run is active at a time; a second request returns the running job.
+    """
+    if not client:
+        raise HTTPException(status_code=500, detail="Docker client not connected")
+    job, created = jobs.submit("update_all", run_update_all, key="update_all")
+    return {**job.to_dict(), "created": created}
+
+
+@app.get("/api/jobs")
+def list_jobs():
+    return jobs.list()
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.post("/api/webhook/update", status_code=202)
 def webhook_update(
     payload: WebhookUpdateRequest,
     x_webhook_token: Optional[str] = Header(default=None, alias="X-Webhook-Token"),
@@ -505,10 +898,19 @@ def webhook_update(
 
     if payload.update_all:
         return update_all_containers()
-    if payload.container_id:
-        return perform_update(payload.container_id)
-    if payload.container_name:
-        return perform_update(payload.container_name)
+    target = payload.container_id or payload.container_name
+    if target:
+        container = get_container_or_404(target)
+        # Refuse up front rather than accepting a job that can only fail.
+        ensure_updatable(container)
+        job, created = jobs.submit(
+            "update",
+            # Webhook pulls queue with bulk updates, behind pulls started from the UI.
+            lambda job: apply_update(container, priority="update"),
+            key=f"update:{container.id}",
+            params={"container": container.name},
+        )
+        return {**job.to_dict(), "created": created}
 
     raise HTTPException(status_code=400, detail="Provide container_id, container_name, or update_all=true")
 
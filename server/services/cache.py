@@ -1,12 +1,181 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from services.generation import GenerationCounter
+from services.registry import ImageReference
+
+STATUS_CACHE_FILE = "status_cache.json"
+logger = logging.getLogger(__name__)
+
+
 class StatusCache:
-    def __init__(self):
+    """
+    Update status per container name, with a check timestamp and TTL per entry.
+    Entries are snapshotted to disk (debounced, atomic rename) and reloaded at
+    startup so the UI has data before the first scan finishes. Unless
+    `status_cache_ttl_minutes` is set, an entry's TTL is its container's check
+    interval as reported by `interval_for` (the scheduler's check schedule).
+    """
+
+    def __init__(self, file_path: str = STATUS_CACHE_FILE, settings_manager=None, save_delay: float = 5.0, broker=None, generations: Optional[GenerationCounter] = None):
+        self.file_path = file_path
+        self.settings = settings_manager
+        self.broker = broker
+        self.generations = generations or GenerationCounter()
+        self.generation = 0
+        self.save_delay = save_delay
         self._cache = {}
+        self._lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        # Container name -> seconds between its checks, or None when unknown.
+        self.interval_for: Optional[Callable[[str], Optional[float]]] = None
+        self._load()
+
+    def _ttl_seconds(self, key: Optional[str] = None) -> float:
+        if not self.settings:
+            return float("inf")
+        if self.settings.get("status_cache_ttl_minutes"):
+            return float(self.settings.get("status_cache_ttl_minutes")) * 60
+        interval = self.interval_for(key) if self.interval_for and key else None
+        return interval or float(self.settings.get("check_interval_minutes") or 60) * 60
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, "r") as f:
+                data = json.load(f) or {}
+            # Generations are per-process; restored entries start at 0.
+            self._cache = {
+                key: {**entry, "generation": 0}
+                for key, entry in data.items()
+                if isinstance(entry, dict) and "status" in entry
+            }
+            logger.info(f"Loaded {len(self._cache)} cached container statuses")
+        except Exception as e:
+            logger.error(f"Failed to load status cache: {e}")
+            self._cache = {}
+
+    def flush(self):
+        """Write the snapshot now. Called by the debounce timer and at shutdown."""
+        with self._lock:
+            self._save_timer = None
+            snapshot = json.dumps(self._cache)
+        tmp_path = f"{self.file_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            logger.error(f"Failed to save status cache: {e}")
+
+    def _schedule_save(self):
+        # Caller holds the lock.
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
 
     def update(self, key: str, status: dict):
-        self._cache[key] = status
+        entry = {
+            "status": status,
+            "checked_at": time.time(),
+        }
+        with self._lock:
+            entry["generation"] = self.generation = self.generations.next()
+            self._cache[key] = entry
+            self._schedule_save()
+        if self.broker:
+            self.broker.publish("status", {"name": key, "status": self._present(key, entry)})
+
+    def remove(self, key: str):
+        with self._lock:
+            if self._cache.pop(key, None) is not None:
+                self.generation = self.generations.next()
+                self._schedule_save()
+
+    def _present(self, key: str, entry: dict) -> dict:
+        checked_at = entry.get("checked_at") or 0
+        return {
+            **entry["status"],
+            "checked_at": datetime.utcfromtimestamp(checked_at).isoformat() + "Z",
+            "stale": time.time() - checked_at > self._ttl_seconds(key),
+        }
 
     def get(self, key: str):
-        return self._cache.get(key)
+        with self._lock:
+            entry = self._cache.get(key)
+        return self._present(key, entry) if entry else None
 
     def get_all(self):
-        return self._cache
+        with self._lock:
+            entries = dict(self._cache)
+        return {key: self._present(key, entry) for key, entry in entries.items()}
+
+    def changed_since(self, since: int) -> List[str]:
+        """Keys updated after generation `since` (entries restored from disk count as generation 0)."""
+        with self._lock:
+            return [key for key, entry in self._cache.items() if entry.get("generation", 0) > since]
+
+    def is_fresh(self, key: str) -> bool:
+        """True when the entry exists, is not an error and is younger than its TTL."""
+        with self._lock:
+            entry = self._cache.get(key)
+        if not entry or entry["status"].get("error"):
+            return False
+        return time.time() - (entry.get("checked_at") or 0) <= self._ttl_seconds(key)
+
+
+IMAGE_FIELDS = ("Id", "RepoTags", "RepoDigests", "Created", "Os", "Architecture", "Variant", "Size")
+
+
+class ImageMetadataCache:
+    """
+    LRU of image inspect data keyed by the immutable image ID, shared by the API,
+    UpdateService and SchedulerService so each image is inspected once rather than
+    once per container per request. Tags are the only mutable part: forget_tag()
+    drops entries whose tag a pull may have moved.
+    """
+
+    def __init__(self, client, max_entries: int = 512):
+        self.client = client
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_id: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(image_id)
+            if entry is not None:
+                self._entries.move_to_end(image_id)
+                return entry
+
+        attrs = self.client.api.inspect_image(image_id)
+        entry = {field: attrs.get(field) for field in IMAGE_FIELDS}
+        with self._lock:
+            self._entries[image_id] = entry
+            self._entries.move_to_end(image_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def forget_tag(self, image_name: str):
+        try:
+            target = str(ImageReference.parse(image_name))
+        except Exception:
+            return
+        with self._lock:
+            for image_id, entry in list(self._entries.items()):
+                for tag in entry.get("RepoTags") or []:
+                    try:
+                        if str(ImageReference.parse(tag)) == target:
+                            del self._entries[image_id]
+                            break
+                    except Exception:
+                        continue
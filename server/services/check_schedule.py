@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Per-container check interval, e.g. "30m", "6h", "1d" or plain minutes.
+INTERVAL_LABEL = "lighthouse.interval"
+MIN_INTERVAL_SECONDS = 60
+_INTERVAL = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$", re.IGNORECASE)
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "": 60}
+
+
+def parse_interval(value) -> Optional[float]:
+    """Seconds for an interval label value, or None when it is missing or malformed."""
+    if value is None:
+        return None
+    match = _INTERVAL.match(str(value))
+    if not match:
+        return None
+    return max(MIN_INTERVAL_SECONDS, float(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()])
+
+
+class CheckSchedule:
+    """
+    Next-due time per container, kept in a min-heap so the scheduler can check
+    containers as they fall due instead of all at once. Containers seen together
+    are spread evenly across their interval; every reschedule adds random jitter
+    (`check_jitter_percent` of the interval) so they do not drift back into
+    lockstep. Intervals come from the `lighthouse.interval` label, then from the
+    image's learned change rate (`adaptive_checks_enabled`), then from
+    `check_interval_minutes`. Stale heap entries are skipped lazily.
+    """
+
+    def __init__(self, settings_manager, churn=None):
+        self.settings = settings_manager
+        self.churn = churn
+        self._heap = []
+        self._due: Dict[str, float] = {}
+        self._intervals: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def default_interval(self) -> float:
+        return max(MIN_INTERVAL_SECONDS, float(self.settings.get("check_interval_minutes") or 60) * 60)
+
+    def interval_for(self, container) -> float:
+        labels = container.attrs.get('Config', {}).get('Labels') or {}
+        explicit = parse_interval(labels.get(INTERVAL_LABEL))
+        if explicit:
+            return explicit
+        if self.churn and self.settings.get("adaptive_checks_enabled"):
+            return self.churn.cadence(container.attrs['Config']['Image'], self.default_interval())
+        return self.default_interval()
+
+    def _jitter(self, interval: float) -> float:
+        fraction = float(self.settings.get("check_jitter_percent") or 0) / 100
+        return random.uniform(-fraction, fraction) * interval
+
+    def _push(self, name: str, due: float):
+        # Caller holds the lock.
+        self._due[name] = due
+        heapq.heappush(self._heap, (due, next(self._sequence), name))
+
+    def sync(self, containers, now: Optional[float] = None):
+        """
+        Track the given containers: new ones are spread evenly over their interval
+        and vanished ones are dropped. A longer interval applies from the next
+        reschedule; a shorter one also pulls the next check in if it is further out.
+        """
+        now = now or time.time()
+        with self._lock:
+            names = {container.name for container in containers}
+            for name in list(self._due):
+                if name not in names:
+                    del self._due[name]
+                    self._intervals.pop(name, None)
+            fresh = []
+            for container in containers:
+                interval = self.interval_for(container)
+                previous = self._intervals.get(container.name)
+                if previous is None:
+                    fresh.append((container.name, interval))
+                elif interval < previous and self._due[container.name] > now + interval:
+                    self._push(container.name, now + random.random() * interval)
+                self._intervals[container.name] = interval
+            for index, (name, interval) in enumerate(fresh):
+                offset = (index + random.random()) / len(fresh) * interval
+                self._push(name, now + offset)
+            if len(self._heap) > 2 * len(self._due) + 64:
+                self._heap = [(due, seq, name) for due, seq, name in self._heap if self._due.get(name) == due]
+                heapq.heapify(self._heap)
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Containers whose check is due, each rescheduled one interval (plus jitter) from now."""
+        now = now or time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, name = heapq.heappop(self._heap)
+                if self._due.get(name) != when:
+                    continue
+                due.append(name)
+            for name in due:
+                interval = self._intervals[name]
+                self._push(name, now + interval + self._jitter(interval))
+        return due
+
+    def reschedule(self, name: str, now: Optional[float] = None):
+        """Push a container's next check one interval out, e.g. after it was checked with a due neighbour."""
+        now = now or time.time()
+        with self._lock:
+            if name in self._intervals:
+                interval = self._intervals[name]
+                self._push(name, now + interval + self._jitter(interval))
+
+    def mark_due(self, names, delay: float = 0, now: Optional[float] = None):
+        """
+        Make containers due within `delay` seconds (never later than they already
+        are), e.g. when the scan that was to check them was cancelled or deferred.
+        """
+        at = (now or time.time()) + delay
+        with self._lock:
+            for name in names:
+                if name in self._intervals and self._due[name] > at:
+                    self._push(name, at)
+
+    def clear(self):
+        with self._lock:
+            self._heap, self._due, self._intervals = [], {}, {}
+
+    def max_gap(self, name: str) -> Optional[float]:
+        """Longest expected time between two checks of a container (interval plus full jitter); None when unscheduled."""
+        with self._lock:
+            interval = self._intervals.get(name)
+        if interval is None:
+            return None
+        return interval * (1 + float(self.settings.get("check_jitter_percent") or 0) / 100)
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def upcoming(self, limit: int = 10) -> List[dict]:
+        with self._lock:
+            entries = sorted(self._due.items(), key=lambda item: item[1])[:limit]
+            return [
+                {
+                    "container": name,
+                    "due_at": datetime.utcfromtimestamp(due).isoformat() + "Z",
+                    "interval_seconds": round(self._intervals[name]),
+                }
+                for name, due in entries
+            ]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._due)
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Checks aimed for per expected change, so a new version waits about 1/60 of its gap on average.
+CHECKS_PER_CHANGE = 30
+# Weight of the prior, in changes: how much evidence it takes to move away from the configured interval.
+PRIOR_CHANGES = 3
+# Cadences are rounded to whole minutes so small estimate changes do not reshuffle the schedule.
+CADENCE_STEP_SECONDS = 60
+
+
+def _epoch(timestamp: Optional[str]) -> Optional[float]:
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def observed_version(result: dict) -> Optional[str]:
+    """The remote version a check saw, tagged with how it was seen; None when it saw nothing."""
+    if result.get("latest_digest"):
+        return f"digest:{result['latest_digest']}"
+    if result.get("latest_id"):
+        return f"id:{result['latest_id']}"
+    return None
+
+
+class ImageChurn:
+    """
+    How often each image reference changes in its registry, learned from what
+    checks observe. The expected time between changes is
+    (observed time + prior time) / (changes + PRIOR_CHANGES), where the prior
+    is chosen so an image with no observations gets exactly
+    `check_interval_minutes`. Stable
+    images therefore back off the longer they stay unchanged and busy ones
+    tighten, always within the adaptive minimum and maximum.
+    Rebuilt at startup from history and the status cache.
+    """
+
+    def __init__(self, settings_manager):
+        self.settings = settings_manager
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def observe(self, image: str, version: Optional[str], at: Optional[float] = None):
+        if not image or not version:
+            return
+        at = at or time.time()
+        with self._lock:
+            entry = self._images.get(image)
+            if entry is None:
+                self._images[image] = {"version": version, "first_seen": at, "last_seen": at, "changes": 0, "last_change": None}
+                return
+            if at < entry["last_seen"]:
+                return
+            previous = entry["version"]
+            entry["version"], entry["last_seen"] = version, at
+            # A check_mode switch changes what is compared, not the image.
+            if previous != version and previous.split(":", 1)[0] == version.split(":", 1)[0]:
+                entry["changes"] += 1
+                entry["last_change"] = at
+
+    def seed(self, history_entries: Iterable[dict], cached_statuses: Optional[dict] = None):
+        """Replay history (oldest first), then the status cache's latest observations."""
+        seeded = 0
+        for entry in history_entries:
+            details = entry.get("details") or {}
+            version = observed_version(details)
+            at = _epoch(entry.get("timestamp"))
+            if details.get("image") and version and at:
+                self.observe(details["image"], version, at)
+                seeded += 1
+        for status in (cached_statuses or {}).values():
+            version = observed_version(status)
+            at = _epoch(status.get("checked_at"))
+            if status.get("image") and version and at:
+                self.observe(status["image"], version, at)
+        logger.info(f"Learned image change rates from {seeded} history entries ({len(self._images)} images)")
+
+    def _bounds(self):
+        minimum = float(self.settings.get("adaptive_min_interval_minutes") or 15) * 60
+        maximum = float(self.settings.get("adaptive_max_interval_minutes") or 1440) * 60
+        return minimum, max(minimum, maximum)
+
+    def cadence(self, image: str, default: float) -> float:
+        """Check interval in seconds for an image reference, `default` being the configured interval."""
+        minimum, maximum = self._bounds()
+        prior = PRIOR_CHANGES * default * CHECKS_PER_CHANGE
+        with self._lock:
+            entry = self._images.get(image)
+            observed = (time.time() - entry["first_seen"]) if entry else 0.0
+            changes = entry["changes"] if entry else 0
+        expected_gap = (observed + prior) / (changes + PRIOR_CHANGES)
+        seconds = min(maximum, max(minimum, expected_gap / CHECKS_PER_CHANGE))
+        return round(seconds / CADENCE_STEP_SECONDS) * CADENCE_STEP_SECONDS
+
+    def snapshot(self, default: float) -> dict:
+        with self._lock:
+            images = {image: dict(entry) for image, entry in self._images.items()}
+        now = time.time()
+        return {
+            image: {
+                "changes": entry["changes"],
+                "observed_days": round((now - entry["first_seen"]) / 86400, 2),
+                "last_change": datetime.utcfromtimestamp(entry["last_change"]).isoformat() + "Z" if entry["last_change"] else None,
+                "cadence_seconds": self.cadence(image, default),
+            }
+            for image, entry in sorted(images.items())
+        }
@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import docker
+
+logger = logging.getLogger(__name__)
+
+IMAGE_GC_FILE = "image_gc.json"
+# docker system df walks every layer; the disk-usage view reuses a result for this long.
+DISK_USAGE_TTL_SECONDS = 300
+# Previous containers kept by update_container are renamed "<name>_old_<short id>".
+RETAINED_NAME = re.compile(r"^(?P<name>.+)_old_(?P<short_id>[0-9a-f]{12})$")
+
+
+def retained_name(container_name: str) -> Optional[str]:
+    """The container name a retained previous container belongs to, or None."""
+    match = RETAINED_NAME.match(container_name or "")
+    return match.group("name") if match else None
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    # Docker reports nanosecond precision; fromisoformat takes at most microseconds.
+    if not value or value.startswith("0001-"):
+        return None
+    try:
+        head, _, fraction = value.rstrip("Z").partition(".")
+        return datetime.fromisoformat(f"{head}.{fraction[:6].ljust(6, '0')}" if fraction else head)
+    except ValueError:
+        return None
+
+
+def _run_batches(items: list, batch_size: int, delay: float, fn):
+    """Call fn(item) for every item, pausing `delay` seconds between batches."""
+    for start in range(0, len(items), batch_size):
+        if start:
+            time.sleep(delay)
+        for item in items[start:start + batch_size]:
+            fn(item)
+
+
+def _batch_settings(settings_manager):
+    if not settings_manager:
+        return 10, 0.0
+    size = int(settings_manager.get("cleanup_batch_size") or 10)
+    delay = float(settings_manager.get("cleanup_batch_delay_seconds") or 0)
+    return max(1, size), max(0.0, delay)
+
+
+class RetainedContainers:
+    """
+    Previous containers kept after an update (retain_previous_container) so a
+    bad image can be rolled back without a pull. A retained container's grace
+    period starts when it was stopped (State.FinishedAt), so nothing needs to
+    be persisted across restarts; reap() removes the expired ones in batches.
+    """
+
+    def __init__(self, client, settings_manager, inventory=None):
+        self.client = client
+        self.settings = settings_manager
+        self.inventory = inventory
+        self.last_reap: Optional[dict] = None
+
+    def _grace(self) -> timedelta:
+        return timedelta(hours=float(self.settings.get("retain_previous_hours") or 24))
+
+    def _all_attrs(self) -> List[dict]:
+        if self.inventory:
+            return self.inventory.list_attrs()
+        return [self.client.api.inspect_container(summary["Id"]) for summary in self.client.api.containers(all=True)]
+
+    def list(self, container_name: Optional[str] = None) -> List[dict]:
+        """Retained containers, newest first, optionally only those of one container."""
+        grace = self._grace()
+        retained = []
+        for attrs in self._all_attrs():
+            name = attrs["Name"].lstrip("/")
+            match = RETAINED_NAME.match(name)
+            state = attrs.get("State") or {}
+            if not match or not attrs["Id"].startswith(match.group("short_id")) or state.get("Running"):
+                continue
+            if container_name and match.group("name") != container_name:
+                continue
+            stopped = _parse_time(state.get("FinishedAt")) or _parse_time(attrs.get("Created")) or datetime.utcnow()
+            retained.append({
+                "id": attrs["Id"],
+                "name": name,
+                "container": match.group("name"),
+                "image": attrs["Config"].get("Image"),
+                "image_id": attrs.get("Image"),
+                "retained_at": stopped.isoformat() + "Z",
+                "expires_at": (stopped + grace).isoformat() + "Z",
+            })
+        retained.sort(key=lambda entry: entry["retained_at"], reverse=True)
+        return retained
+
+    def latest(self, container_name: str) -> Optional[dict]:
+        retained = self.list(container_name)
+        return retained[0] if retained else None
+
+    def reap(self) -> dict:
+        """Remove retained containers whose grace period has passed."""
+        now = datetime.utcnow().isoformat() + "Z"
+        expired = [entry for entry in self.list() if entry["expires_at"] <= now]
+        removed, failed = [], []
+
+        def remove(entry):
+            try:
+                self.client.api.remove_container(entry["id"], v=False)
+                removed.append(entry["name"])
+            except docker.errors.NotFound:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to remove retained container {entry['name']}: {e}")
+                failed.append(entry["name"])
+
+        _run_batches(expired, *_batch_settings(self.settings), remove)
+        if removed:
+            logger.info(f"Removed {len(removed)} expired previous containers")
+        self.last_reap = {"finished_at": datetime.utcnow().isoformat() + "Z", "removed": removed, "failed": failed}
+        return self.last_reap
+
+
+class ImageCollector:
+    """
+    Garbage collector for images superseded by updates (cleanup_enabled).
+    update_container reports each replaced image ID through track(); after a
+    scan, collect() removes the tracked images no container references any
+    more, plus dangling images, in rate-limited batches. Tracked IDs are kept
+    on disk so a restart does not leak them.
+    """
+
+    def __init__(self, client, settings_manager, inventory=None, file_path: str = IMAGE_GC_FILE, df_ttl: float = DISK_USAGE_TTL_SECONDS):
+        self.client = client
+        self.settings = settings_manager
+        self.inventory = inventory
+        self.file_path = file_path
+        self.df_ttl = df_ttl
+        self.last_run: Optional[dict] = None
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._collect_lock = threading.Lock()
+        self._df = None
+        self._df_at = 0.0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, "r") as f:
+                data = json.load(f) or {}
+            self._tracked = {image_id: entry for image_id, entry in (data.get("tracked") or {}).items() if isinstance(entry, dict)}
+            self.last_run = data.get("last_run")
+        except Exception as e:
+            logger.error(f"Failed to load image GC state: {e}")
+
+    def _save(self):
+        # Caller holds the lock.
+        try:
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"tracked": self._tracked, "last_run": self.last_run}, f)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            logger.error(f"Failed to save image GC state: {e}")
+
+    def track(self, image_id: str, image_name: Optional[str] = None):
+        """Remember an image that an update replaced."""
+        if not image_id:
+            return
+        with self._lock:
+            self._tracked[image_id] = {"image": image_name, "since": datetime.utcnow().isoformat() + "Z"}
+            self._save()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._tracked)
+
+    def _referenced(self) -> set:
+        if self.inventory:
+            return {attrs.get("Image") for attrs in self.inventory.list_attrs()}
+        return {summary.get("ImageID") for summary in self.client.api.containers(all=True)}
+
+    def _system_df(self, refresh: bool = False) -> dict:
+        with self._lock:
+            if not refresh and self._df is not None and time.monotonic() - self._df_at < self.df_ttl:
+                return self._df
+        df = self.client.df()
+        with self._lock:
+            self._df, self._df_at = df, time.monotonic()
+        return df
+
+    @staticmethod
+    def _unique_size(image: dict) -> int:
+        # Size counts layers shared with other images; only the unshared part is freed.
+        size, shared = image.get("Size") or 0, image.get("SharedSize")
+        return max(0, size - shared) if isinstance(shared, int) and shared >= 0 else size
+
+    @staticmethod
+    def _dangling(image: dict) -> bool:
+        return not [tag for tag in image.get("RepoTags") or [] if tag != "<none>:<none>"]
+
+    def _candidates(self, df: dict) -> List[dict]:
+        referenced = self._referenced()
+        with self._lock:
+            tracked = dict(self._tracked)
+        candidates = []
+        for image in df.get("Images") or []:
+            if image["Id"] in referenced or (image.get("Containers") or 0) > 0:
+                continue
+            if image["Id"] in tracked or self._dangling(image):
+                candidates.append({
+                    "id": image["Id"],
+                    "image": (tracked.get(image["Id"]) or {}).get("image"),
+                    "tracked": image["Id"] in tracked,
+                    "bytes": self._unique_size(image),
+                })
+        return candidates
+
+    def collect(self) -> dict:
+        """Remove unreferenced superseded and dangling images; returns the run summary."""
+        if not self._collect_lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "Image cleanup already running"}
+        try:
+            started = time.monotonic()
+            df = self._system_df(refresh=True)
+            candidates = self._candidates(df)
+            present = {image["Id"] for image in df.get("Images") or []}
+            summary = {"removed": 0, "failed": 0, "bytes_reclaimed": 0, "images": []}
+
+            def remove(candidate):
+                try:
+                    self.client.images.remove(image=candidate["id"])
+                except docker.errors.NotFound:
+                    pass
+                except docker.errors.APIError as e:
+                    # Still tagged elsewhere or used by a child image; not ours to force.
+                    logger.info(f"Keeping image {candidate['id'][:19]}: {e}")
+                    summary["failed"] += 1
+                    return
+                summary["removed"] += 1
+                summary["bytes_reclaimed"] += candidate["bytes"]
+                summary["images"].append(candidate["image"] or candidate["id"][:19])
+
+            _run_batches(candidates, *_batch_settings(self.settings), remove)
+
+            # Tracked images that are gone now (or were already) need no more attention;
+            # ones still referenced by a container wait for a later run.
+            attempted = {candidate["id"] for candidate in candidates}
+            with self._lock:
+                for image_id in list(self._tracked):
+                    if image_id in attempted or image_id not in present:
+                        del self._tracked[image_id]
+                summary["pending"] = len(self._tracked)
+                summary["finished_at"] = datetime.utcnow().isoformat() + "Z"
+                summary["duration_seconds"] = round(time.monotonic() - started, 2)
+                self.last_run = summary
+                self._save()
+                # The cached df no longer matches the disk.
+                self._df = None
+            if summary["removed"]:
+                logger.info(f"Image cleanup removed {summary['removed']} images, reclaimed {summary['bytes_reclaimed']} bytes")
+            return summary
+        finally:
+            self._collect_lock.release()
+
+    def disk_usage(self, refresh: bool = False) -> dict:
+        """Docker disk usage and what the collector could reclaim, from a cached df()."""
+        df = self._system_df(refresh=refresh)
+        images = df.get("Images") or []
+        containers = df.get("Containers") or []
+        volumes = df.get("Volumes") or []
+        build_cache = df.get("BuildCache") or []
+        candidates = self._candidates(df)
+        with self._lock:
+            cached_at = time.time() - (time.monotonic() - self._df_at)
+        return {
+            "generated_at": datetime.utcfromtimestamp(cached_at).isoformat() + "Z",
+            "images": {
+                "count": len(images),
+                "active": sum(1 for image in images if (image.get("Containers") or 0) > 0),
+                "size": df.get("LayersSize") or 0,
+                "reclaimable": sum(self._unique_size(image) for image in images if (image.get("Containers") or 0) <= 0),
+            },
+            "containers": {
+                "count": len(containers),
+                "running": sum(1 for container in containers if container.get("State") == "running"),
+                "size": sum(container.get("SizeRw") or 0 for container in containers),
+            },
+            "volumes": {
+                "count": len(volumes),
+                "size": sum(max(0, (volume.get("UsageData") or {}).get("Size") or 0) for volume in volumes),
+            },
+            "build_cache": {
+                "count": len(build_cache),
+                "size": sum(entry.get("Size") or 0 for entry in build_cache),
+            },
+            "cleanup": {
+                "enabled": bool(self.settings.get("cleanup_enabled")) if self.settings else False,
+                "tracked": self.pending(),
+                "candidates": len(candidates),
+                "reclaimable": sum(candidate["bytes"] for candidate in candidates),
+                "last_run": self.last_run,
+            },
+        }
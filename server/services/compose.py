@@ -0,0 +1,167 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROJECT_LABEL = "com.docker.compose.project"
+SERVICE_LABEL = "com.docker.compose.service"
+# Written by Compose v2 as "db:service_healthy:false,cache:service_started:true".
+DEPENDS_ON_LABEL = "com.docker.compose.depends_on"
+
+
+def _labels(container) -> dict:
+    return container.attrs.get('Config', {}).get('Labels') or {}
+
+
+def project_of(container) -> Optional[str]:
+    return _labels(container).get(PROJECT_LABEL) or None
+
+
+def service_of(container) -> str:
+    return _labels(container).get(SERVICE_LABEL) or container.name
+
+
+def depends_on(container) -> List[str]:
+    value = _labels(container).get(DEPENDS_ON_LABEL) or ""
+    return [entry.split(":", 1)[0].strip() for entry in value.split(",") if entry.strip()]
+
+
+def group_by_project(containers) -> Dict[str, List]:
+    """
+    Update units keyed by compose project, keeping list order. Containers that
+    are not part of a project each form their own unit.
+    """
+    groups: Dict[str, List] = {}
+    for container in containers:
+        project = project_of(container)
+        groups.setdefault(f"project:{project}" if project else f"container:{container.name}", []).append(container)
+    return groups
+
+
+def dependency_order(containers) -> List:
+    """
+    Containers ordered so every service comes after the services it depends on,
+    otherwise keeping list order. Dependency cycles are broken at the point they
+    are found rather than rejected.
+    """
+    services: Dict[str, List] = {}
+    for container in containers:
+        services.setdefault(service_of(container), []).append(container)
+
+    ordered, done = [], set()
+
+    def visit(service: str, path: set):
+        if service in done or service in path:
+            return
+        path.add(service)
+        for container in services[service]:
+            for dependency in depends_on(container):
+                if dependency in services:
+                    visit(dependency, path)
+        path.discard(service)
+        done.add(service)
+        ordered.extend(services[service])
+
+    for service in services:
+        visit(service, set())
+    return ordered
+
+
+class BatchUpdater:
+    """
+    Applies a batch of updates grouped by compose project. All images are pulled
+    in parallel up front (each reference once), then each project's containers
+    are recreated one at a time in dependency order once all of its images are in.
+    Independent projects run concurrently, up to `project_concurrency` at once,
+    so a full-stack update costs roughly the slowest pull rather than the sum.
+    """
+
+    def __init__(self, updater, settings_manager):
+        self.updater = updater
+        self.settings = settings_manager
+
+    def run(
+        self,
+        pending: List[Tuple[object, dict]],
+        containers: Optional[list] = None,
+        on_result: Optional[Callable[[object, dict, dict], None]] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ):
+        """
+        Update every (container, check_result) in `pending`. `containers` is the
+        full container list, so dependencies through containers that are not being
+        updated still order the ones that are. on_result(container, check_result,
+        update_result) is called from worker threads as each container finishes.
+        Once cancelled() returns True no further container is recreated and pulls
+        still waiting for a worker or a pull slot are dropped; a pull or recreate
+        in progress always completes.
+        """
+        if not pending:
+            return
+        checks = {container.id: check for container, check in pending}
+        units = group_by_project(container for container, _ in pending)
+        everything = group_by_project(containers or [container for container, _ in pending])
+        project_workers = max(1, int(self.settings.get("project_concurrency") or 1))
+        pull_workers = max(1, int(self.settings.get("scan_concurrency") or 1))
+
+        def report(container, update_result):
+            if on_result:
+                try:
+                    on_result(container, checks[container.id], update_result)
+                except Exception as e:
+                    logger.error(f"Recording update result for {container.name} failed: {e}")
+
+        with ThreadPoolExecutor(max_workers=pull_workers, thread_name_prefix="lighthouse-prepull") as pull_pool:
+            # Every pull starts now, so projects still waiting for a worker find their images ready.
+            # Images resolved by pulling during the check are already local.
+            pulls = {}
+            for container, check in pending:
+                image_name = container.attrs['Config']['Image']
+                if check.get("check_mode") != "pull" and image_name not in pulls:
+                    names = [c.name for c, _ in pending if c.attrs['Config']['Image'] == image_name]
+                    pulls[image_name] = pull_pool.submit(self.updater.pull_image, image_name, names, cancelled=cancelled)
+
+            def stopped() -> bool:
+                if cancelled and cancelled():
+                    for future in pulls.values():
+                        future.cancel()
+                    return True
+                return False
+
+            def update_unit(key: str, members: list):
+                # Nothing in a project is recreated until all of its images are local.
+                if stopped():
+                    return
+                auth_warnings, pull_errors = {}, {}
+                for image_name in {container.attrs['Config']['Image'] for container in members}:
+                    if image_name not in pulls:
+                        continue
+                    try:
+                        auth_warnings[image_name] = pulls[image_name].result()
+                    except Exception as e:
+                        logger.error(f"Failed to pull image {image_name}: {e}")
+                        pull_errors[image_name] = f"Failed to pull image: {e}"
+
+                member_ids = {container.id for container in members}
+                for container in dependency_order(everything.get(key) or members):
+                    if container.id not in member_ids:
+                        continue
+                    if stopped():
+                        return
+                    image_name = container.attrs['Config']['Image']
+                    if image_name in pull_errors:
+                        report(container, {"success": False, "error": pull_errors[image_name]})
+                        continue
+                    result = self.updater.update_container(container.id, pull=False)
+                    if auth_warnings.get(image_name) and result.get("success"):
+                        result["auth_warning"] = auth_warnings[image_name]
+                    report(container, result)
+
+            with ThreadPoolExecutor(max_workers=project_workers, thread_name_prefix="lighthouse-project") as project_pool:
+                futures = [project_pool.submit(update_unit, key, members) for key, members in units.items()]
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Project update failed: {e}")
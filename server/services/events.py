@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """
+    Fan-out of server-side changes (container state, status cache, history,
+    scan progress) to Server-Sent Events subscribers. Every event gets a
+    monotonically increasing ID, numbered from the process start time in
+    milliseconds (like GenerationCounter) so an ID from a previous process is
+    recognised after a restart; a bounded replay buffer lets clients resume
+    from `Last-Event-ID` after a reconnect. Publishing is thread-safe and never
+    blocks on slow subscribers.
+    """
+
+    def __init__(self, buffer_size: int = 1000, keepalive_seconds: float = 15.0):
+        self.keepalive_seconds = keepalive_seconds
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self.start = int(time.time() * 1000)
+        self._ids = itertools.count(self.start + 1)
+        self._last_id = self.start
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event_type: str, data: dict) -> int:
+        with self._lock:
+            event_id = next(self._ids)
+            self._buffer.append((event_id, event_type, data))
+            self._last_id = event_id
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # Subscriber's loop already closed.
+                pass
+        return event_id
+
+    def since(self, cursor: int) -> Tuple[List[tuple], bool]:
+        """
+        Events after `cursor`. The flag is True when the cursor predates the
+        replay buffer, i.e. the client missed events and must refetch.
+        """
+        with self._lock:
+            if not self._buffer or cursor >= self._last_id:
+                return [], False
+            oldest = self._buffer[0][0]
+            events = [event for event in self._buffer if event[0] > cursor]
+        return events, cursor < oldest - 1
+
+    @staticmethod
+    def _format(event_id: Optional[int], event_type: str, data: dict) -> str:
+        prefix = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{prefix}event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    async def stream(self, cursor: Optional[int] = None) -> AsyncIterator[str]:
+        """SSE body for one subscriber. Without a cursor only new events are sent."""
+        loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        entry = (loop, waiter)
+        with self._lock:
+            self._waiters.add(entry)
+            restarted = cursor is not None and not self.start <= cursor <= self._last_id
+            if cursor is None or restarted:
+                cursor = self._last_id
+        try:
+            yield "retry: 3000\n\n"
+            if restarted:
+                # Cursor issued by another process: nothing it saw carries over.
+                yield self._format(None, "reset", {"reason": "Server restarted; refetch state"})
+            yield self._format(cursor, "hello", {"cursor": cursor})
+            while True:
+                waiter.clear()
+                events, missed = self.since(cursor)
+                if missed:
+                    yield self._format(None, "reset", {"reason": "Missed events; refetch state"})
+                for event_id, event_type, data in events:
+                    yield self._format(event_id, event_type, data)
+                    cursor = event_id
+                if events or missed:
+                    continue
+                try:
+                    await asyncio.wait_for(waiter.wait(), timeout=self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._waiters.discard(entry)
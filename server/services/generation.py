@@ -0,0 +1,36 @@
+import itertools
+import threading
+import time
+
+
+class GenerationCounter:
+    """
+    Process-wide, monotonically increasing change counter shared by the container
+    inventory, StatusCache and HistoryService so their generations are comparable.
+    Numbering starts at the process start time in milliseconds, so generations
+    keep increasing across restarts and a cursor from a previous process can be
+    recognised (it is below `start`).
+    """
+
+    def __init__(self):
+        self.start = int(time.time() * 1000)
+        self._counter = itertools.count(self.start + 1)
+        self._value = self.start
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        with self._lock:
+            self._value = next(self._counter)
+            return self._value
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def is_current(self, since: int) -> bool:
+        """True when `since` was issued by this process."""
+        return self.start <= since <= self._value
+
+    @staticmethod
+    def etag(kind: str, generation: int) -> str:
+        return f'W/"{kind}-{generation}"'
@@ -1,36 +1,544 @@
+import base64
+import csv
+import io
 import json
 import logging
 import os
-from datetime import datetime
-from typing import List, Optional
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from uuid import uuid4
 
-HISTORY_FILE = "history.json"
+from services.generation import GenerationCounter
+from services.stats import HistoryStats
+
+HISTORY_DB_FILE = "history.db"
+HISTORY_FILE = "history.jsonl"
+LEGACY_HISTORY_FILE = "history.json"
 logger = logging.getLogger(__name__)
 
+# Retention runs at startup, then after this many events or this many seconds.
+RETENTION_EVERY_EVENTS = 500
+RETENTION_EVERY_SECONDS = 3600
 
-class HistoryService:
-    def __init__(self, file_path: str = HISTORY_FILE, max_entries: int = 500):
+# Page totals are counted up to this many matches; beyond it the total is a lower bound.
+TOTAL_HINT_CAP = 10000
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_COLUMNS = ("seq", "id", "timestamp", "action", "status", "container", "trigger", "message", "details")
+
+ENTRY_FIELDS = ("seq", "id", "timestamp", "action", "status", "message", "container", "trigger", "details", "generation")
+
+
+def format_timestamp(value: datetime) -> str:
+    """Fixed-width UTC timestamp, so string order is time order."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds") + "Z"
+
+
+def parse_timestamp(value: Union[str, datetime, None]) -> Optional[str]:
+    """Normalise an ISO-8601 string or datetime filter bound to the stored format."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return format_timestamp(value)
+
+
+def encode_cursor(direction: str, seq: int) -> str:
+    return base64.urlsafe_b64encode(f"{direction}:{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """(direction, seq) from an opaque page cursor; raises ValueError when malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, seq = base64.urlsafe_b64decode(padded.encode()).decode().split(":", 1)
+        seq = int(seq)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if direction not in ("before", "after"):
+        raise ValueError("Invalid cursor")
+    return direction, seq
+
+
+class JsonlHistoryStore:
+    """
+    Append-only JSON Lines journal with the retained entries held in memory.
+    Each event is one appended line (O(1)); once the file holds `compact_factor`
+    times more lines than are retained it is compacted by writing the live
+    entries to a temp file and renaming it over the journal, so a crash never
+    leaves a half-written history behind. Queries scan the in-memory list, so
+    this backend suits small histories; use SqliteHistoryStore for long retention.
+    """
+
+    def __init__(self, file_path: str = HISTORY_FILE, max_entries: int = 500, compact_factor: int = 2):
         self.file_path = file_path
         self.max_entries = max_entries
-        self._history: List[dict] = []
-        self._load()
+        self.compact_factor = compact_factor
+        self._entries: deque = deque(maxlen=max_entries)
+        # Entries carry an increasing `seq` (persisted in the journal) used as the page cursor key.
+        self._seq = 0
+        self._lines = 0
+        self._handle = None
 
-    def _load(self):
+    def load(self) -> int:
+        """Stream the journal, keeping the newest `max_entries`. A torn last line is dropped."""
+        dirty = False
         if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, "r") as f:
-                    self._history = json.load(f) or []
-            except Exception as e:
-                logger.error(f"Failed to load history: {e}")
-                self._history = []
+            with open(self.file_path, "r") as f:
+                for line in f:
+                    self._lines += 1
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        dirty = True
+                        logger.warning(f"Skipping corrupt history line {self._lines} in {self.file_path}")
+                        continue
+                    if not isinstance(entry.get("seq"), int) or entry["seq"] <= self._seq:
+                        entry["seq"] = self._seq + 1
+                        dirty = True
+                    self._seq = entry["seq"]
+                    self._entries.append(entry)
+        if dirty:
+            self._rewrite()
+        return len(self._entries)
+
+    def _open(self):
+        if self._handle is None:
+            self._handle = open(self.file_path, "a")
+        return self._handle
+
+    def append(self, entries: Iterable[dict], on_remove: Optional[Callable[[dict], None]] = None):
+        """Journal entries; on_remove(entry) is called for each old entry the bounded list evicts."""
+        handle = self._open()
+        for entry in entries:
+            self._seq += 1
+            entry["seq"] = self._seq
+            if on_remove and len(self._entries) == self._entries.maxlen:
+                on_remove(self._entries[0])
+            self._entries.append(entry)
+            handle.write(json.dumps(entry) + "\n")
+            self._lines += 1
+        handle.flush()
+        if self._lines > self.max_entries * self.compact_factor:
+            self._rewrite()
 
-    def _save(self):
+    def _rewrite(self):
+        """Atomically replace the journal with exactly the retained entries."""
+        self.close()
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for entry in self._entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+        self._lines = len(self._entries)
+
+    @staticmethod
+    def _matches(
+        item: dict,
+        action: Optional[str] = None,
+        status: Optional[str] = None,
+        container: Optional[str] = None,
+        trigger: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        since: Optional[int] = None,
+    ) -> bool:
+        if since is not None and item.get("generation", 0) <= since:
+            return False
+        for field, value in (("action", action), ("status", status), ("container", container), ("trigger", trigger)):
+            if value and item.get(field) != value:
+                return False
+        if start and item.get("timestamp", "") < start:
+            return False
+        if end and item.get("timestamp", "") >= end:
+            return False
+        return True
+
+    def query(self, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None, **filters) -> List[dict]:
+        """Newest-first matches, optionally only those with seq below `before` or above `after`."""
+        records = []
+        if after is not None:
+            # Oldest-first from the cursor, so the page is the one right after it.
+            for item in self._entries:
+                if item["seq"] > after and self._matches(item, **filters):
+                    records.append(item)
+                    if limit and len(records) >= limit:
+                        break
+            return list(reversed(records))
+        for item in reversed(self._entries):
+            if before is not None and item["seq"] >= before:
+                continue
+            if filters.get("since") is not None and item.get("generation", 0) <= filters["since"]:
+                break
+            if self._matches(item, **filters):
+                records.append(item)
+                if limit and len(records) >= limit:
+                    break
+        return records
+
+    def count(self, cap: int, **filters) -> int:
+        total = 0
+        for item in self._entries:
+            if self._matches(item, **filters):
+                total += 1
+                if total >= cap:
+                    break
+        return total
+
+    def prune(self, older_than: Optional[str] = None, max_entries: Optional[int] = None, on_remove: Optional[Callable[[dict], None]] = None) -> int:
+        before = len(self._entries)
+        if max_entries and max_entries < self.max_entries:
+            while len(self._entries) > max_entries:
+                removed = self._entries.popleft()
+                if on_remove:
+                    on_remove(removed)
+        if older_than:
+            while self._entries and self._entries[0].get("timestamp", "") < older_than:
+                removed = self._entries.popleft()
+                if on_remove:
+                    on_remove(removed)
+        removed = before - len(self._entries)
+        if removed:
+            self._rewrite()
+        return removed
+
+    def clear(self):
+        self._entries.clear()
+        self._rewrite()
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class SqliteHistoryStore:
+    """
+    History in a SQLite database (WAL mode) with indexes on timestamp, container,
+    action, status and trigger. Filtered, newest-first queries walk an index instead of
+    scanning, so months of history stay cheap to query. Not thread-safe on its
+    own; HistoryService serialises access.
+    """
+
+    def __init__(self, file_path: str = HISTORY_DB_FILE, max_entries: int = 100000):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.file_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS history (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    generation INTEGER NOT NULL DEFAULT 0,
+                    timestamp TEXT NOT NULL,
+                    action TEXT,
+                    status TEXT,
+                    message TEXT,
+                    container TEXT,
+                    trigger TEXT,
+                    details TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_history_container ON history (container, seq);
+                CREATE INDEX IF NOT EXISTS idx_history_action ON history (action, seq);
+                CREATE INDEX IF NOT EXISTS idx_history_status ON history (status, seq);
+                CREATE INDEX IF NOT EXISTS idx_history_trigger ON history (trigger, seq);
+                CREATE INDEX IF NOT EXISTS idx_history_generation ON history (generation);
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def load(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def append(self, entries: Iterable[dict], on_remove: Optional[Callable[[dict], None]] = None):
+        # The table is unbounded between prunes, so nothing is ever evicted here.
+        rows = [
+            (
+                entry["id"],
+                entry.get("generation") or 0,
+                entry.get("timestamp") or "",
+                entry.get("action"),
+                entry.get("status"),
+                entry.get("message"),
+                entry.get("container"),
+                entry.get("trigger"),
+                json.dumps(entry.get("details") or {}),
+            )
+            for entry in entries
+        ]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO history (id, generation, timestamp, action, status, message, container, trigger, details)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> dict:
+        entry = {field: row[field] for field in ENTRY_FIELDS}
         try:
-            with open(self.file_path, "w") as f:
-                json.dump(self._history, f, indent=2)
+            entry["details"] = json.loads(row["details"]) if row["details"] else {}
+        except json.JSONDecodeError:
+            entry["details"] = {}
+        return entry
+
+    @staticmethod
+    def _where(
+        action: Optional[str] = None,
+        status: Optional[str] = None,
+        container: Optional[str] = None,
+        trigger: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        since: Optional[int] = None,
+    ):
+        clauses, params = [], []
+        for column, value in (("action", action), ("status", status), ("container", container), ("trigger", trigger)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        if since is not None:
+            clauses.append("generation > ?")
+            params.append(since)
+        return clauses, params
+
+    def query(self, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None, **filters) -> List[dict]:
+        """Newest-first matches, optionally only those with seq below `before` or above `after`."""
+        clauses, params = self._where(**filters)
+        if before is not None:
+            clauses.append("seq < ?")
+            params.append(before)
+        if after is not None:
+            clauses.append("seq > ?")
+            params.append(after)
+        sql = "SELECT * FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # Keyset paging: walk seq from the cursor so cost is independent of history size.
+        sql += " ORDER BY seq ASC" if after is not None else " ORDER BY seq DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = [self._row_to_entry(row) for row in self._connect().execute(sql, params)]
+        return list(reversed(rows)) if after is not None else rows
+
+    def count(self, cap: int, **filters) -> int:
+        """Matching rows, counting no further than `cap`."""
+        clauses, params = self._where(**filters)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        sql = f"SELECT COUNT(*) FROM (SELECT 1 FROM history{where} LIMIT ?)"
+        return self._connect().execute(sql, [*params, cap]).fetchone()[0]
+
+    def prune(self, older_than: Optional[str] = None, max_entries: Optional[int] = None, on_remove: Optional[Callable[[dict], None]] = None) -> int:
+        """Delete entries past retention; on_remove(entry) sees each one first."""
+        clauses, params = [], []
+        if older_than:
+            clauses.append("timestamp < ?")
+            params.append(older_than)
+        if max_entries:
+            clauses.append("seq <= (SELECT seq FROM history ORDER BY seq DESC LIMIT 1 OFFSET ?)")
+            params.append(max_entries)
+        if not clauses:
+            return 0
+        where = " OR ".join(clauses)
+        conn = self._connect()
+        with conn:
+            if on_remove:
+                for row in conn.execute(f"SELECT * FROM history WHERE {where} ORDER BY seq", params):
+                    on_remove(self._row_to_entry(row))
+            return conn.execute(f"DELETE FROM history WHERE {where}", params).rowcount
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM history")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class HistoryService:
+    """
+    Audit log of checks, updates and scans. Storage is pluggable: "sqlite"
+    (default, indexed, long retention) or "jsonl" (in-memory journal). Old
+    entries are pruned by age (`history_retention_days`) and by count
+    (`history_max_entries`) when a settings manager is given.
+
+    Writes are write-behind: log_event() only queues the entry, and a background
+    writer group-commits the queue once it holds `batch_size` entries or
+    `flush_interval` seconds have passed. Reads flush the queue first, so an
+    entry is visible as soon as log_event() returns.
+    """
+
+    def __init__(
+        self,
+        file_path: Optional[str] = None,
+        max_entries: int = 500,
+        broker=None,
+        generations: Optional[GenerationCounter] = None,
+        backend: str = "sqlite",
+        settings_manager=None,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+    ):
+        self.settings = settings_manager
+        self.backend = backend
+        self.max_entries = max_entries
+        self.broker = broker
+        self.generations = generations or GenerationCounter()
+        self.generation = self.generations.next()
+        # Generation of the last clear(); `since` cursors older than this must refetch.
+        self.cleared_generation = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # _lock guards the pending queue; _store_lock serialises all store access.
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._store_lock = threading.Lock()
+        self._pending: List[dict] = []
+        self._stopped = False
+        if backend == "sqlite":
+            self.file_path = file_path or HISTORY_DB_FILE
+            self._store = SqliteHistoryStore(self.file_path, max_entries)
+        else:
+            self.file_path = file_path or HISTORY_FILE
+            self._store = JsonlHistoryStore(self.file_path, max_entries)
+        self._events_since_prune = 0
+        self._pruned_at = 0.0
+        self.stats = HistoryStats()
+        self._load()
+        self._writer = threading.Thread(target=self._write_loop, name="lighthouse-history-writer", daemon=True)
+        self._writer.start()
+
+    def _load(self):
+        try:
+            count = self._store.load()
+            if not count:
+                self._migrate()
+            self._prune(track=False)
+            self._rebuild_stats()
         except Exception as e:
-            logger.error(f"Failed to save history: {e}")
+            logger.error(f"Failed to load history: {e}")
+
+    def _iter_store(self, batch_size: int = 1000, **filters):
+        """Oldest-first walk over the store in keyset batches. Caller holds the store lock."""
+        after = 0
+        while True:
+            batch = self._store.query(limit=batch_size, after=after, **filters)
+            if not batch:
+                return
+            yield from reversed(batch)
+            after = batch[0]["seq"]
+
+    def _rebuild_stats(self):
+        # Caller holds the store lock (or is the constructor).
+        started = time.monotonic()
+        self.stats.reset()
+        count = 0
+        for entry in self._iter_store():
+            self.stats.observe(entry)
+            count += 1
+        logger.info(f"Rebuilt history stats from {count} entries in {time.monotonic() - started:.2f}s")
+
+    def _migrate(self):
+        """One-time import from an older history file into an empty store."""
+        sources = [HISTORY_FILE, LEGACY_HISTORY_FILE] if self.backend == "sqlite" else [LEGACY_HISTORY_FILE]
+        for source in sources:
+            if not os.path.exists(source):
+                continue
+            if source.endswith(".jsonl"):
+                legacy = JsonlHistoryStore(source, self.max_entries)
+                legacy.load()
+                entries = list(legacy._entries)
+            else:
+                with open(source, "r") as f:
+                    entries = (json.load(f) or [])[-self.max_entries :]
+            self._store.append(entries)
+            logger.info(f"Migrated {len(entries)} history entries from {source}")
+            return
+
+    def _retention(self):
+        max_entries = self.max_entries
+        days = 0
+        if self.settings:
+            max_entries = self.settings.get("history_max_entries") or max_entries
+            days = self.settings.get("history_retention_days") or 0
+        older_than = format_timestamp(datetime.utcnow() - timedelta(days=days)) if days else None
+        return older_than, max_entries
+
+    def _prune(self, track: bool = True) -> int:
+        # Caller holds the store lock (or is the constructor, which rebuilds stats afterwards).
+        older_than, max_entries = self._retention()
+        # Pruned entries are subtracted from the stats one by one rather than rescanning the store.
+        removed = self._store.prune(older_than=older_than, max_entries=max_entries, on_remove=self.stats.forget if track else None)
+        self._events_since_prune = 0
+        self._pruned_at = time.time()
+        if removed:
+            logger.info(f"History retention removed {removed} entries")
+        return removed
+
+    def _write_loop(self):
+        while True:
+            with self._wakeup:
+                while not self._stopped and not self._pending:
+                    self._wakeup.wait()
+                # Give the batch up to flush_interval to fill before committing it.
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopped and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                if self._stopped:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Group-commit all queued entries. Safe to call from any thread."""
+        with self._store_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                # Stats follow the store exactly, so a rebuild never double-counts queued entries.
+                # Observed first so entries a bounded store evicts, even from this batch, are subtracted.
+                for entry in batch:
+                    self.stats.observe(entry)
+                self._store.append(batch, on_remove=self.stats.forget)
+                self._events_since_prune += len(batch)
+                if self._events_since_prune >= RETENTION_EVERY_EVENTS or time.time() - self._pruned_at >= RETENTION_EVERY_SECONDS:
+                    self._prune()
+            except Exception as e:
+                logger.error(f"Failed to save {len(batch)} history entries: {e}")
 
     def log_event(
         self,
@@ -43,7 +551,7 @@ class HistoryService:
     ) -> dict:
         entry = {
             "id": str(uuid4()),
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": format_timestamp(datetime.utcnow()),
             "action": action,
             "status": status,
             "message": message or "",
@@ -51,22 +559,168 @@ class HistoryService:
             "trigger": trigger,
             "details": details or {},
         }
-        self._history.append(entry)
-        if len(self._history) > self.max_entries:
-            self._history = self._history[-self.max_entries :]
-        self._save()
+        with self._wakeup:
+            entry["generation"] = self.generation = self.generations.next()
+            self._pending.append(entry)
+            if len(self._pending) in (1, self.batch_size):
+                self._wakeup.notify()
+            stopped = self._stopped
+        if stopped:
+            # Writer already gone (late events during shutdown): write through.
+            self.flush()
+        if self.broker:
+            self.broker.publish("history", entry)
         return entry
 
-    def get_history(self, action: Optional[str] = None, status: Optional[str] = None, limit: int = 100) -> List[dict]:
-        records = self._history
-        if action:
-            records = [item for item in records if item.get("action") == action]
-        if status:
-            records = [item for item in records if item.get("status") == status]
-        if limit:
-            records = records[-limit:]
-        return list(reversed(records))
+    def get_history(
+        self,
+        action: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+        since: Optional[int] = None,
+        container: Optional[str] = None,
+        start: Union[str, datetime, None] = None,
+        end: Union[str, datetime, None] = None,
+        trigger: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Newest-first entries, optionally for one container and/or a time range
+        (`start` inclusive, `end` exclusive). With `since`, only entries logged
+        after that generation.
+        """
+        filters = {
+            "action": action, "status": status, "container": container, "trigger": trigger,
+            "start": parse_timestamp(start), "end": parse_timestamp(end), "since": since,
+        }
+        # Read barrier: queued entries must be visible to the query.
+        self.flush()
+        with self._store_lock:
+            try:
+                return self._store.query(limit=limit, **filters)
+            except Exception as e:
+                logger.error(f"Failed to read history: {e}")
+                return []
+
+    def get_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        action: Optional[str] = None,
+        status: Optional[str] = None,
+        container: Optional[str] = None,
+        trigger: Optional[str] = None,
+        start: Union[str, datetime, None] = None,
+        end: Union[str, datetime, None] = None,
+    ) -> dict:
+        """
+        One newest-first page of matching entries. `next_cursor` fetches older
+        entries and `prev_cursor` newer ones (None when there are none). Pages
+        are keyed on the entry sequence number, so fetching any page costs the
+        same regardless of history size. `total` is exact when `total_exact`,
+        otherwise a lower bound.
+        """
+        limit = max(1, min(int(limit or 50), 500))
+        direction, seq = decode_cursor(cursor) if cursor else ("before", None)
+        filters = {
+            "action": action, "status": status, "container": container, "trigger": trigger,
+            "start": parse_timestamp(start), "end": parse_timestamp(end),
+        }
+        self.flush()
+        with self._store_lock:
+            if direction == "after":
+                rows = self._store.query(limit=limit + 1, after=seq, **filters)
+                has_newer, items = len(rows) > limit, rows[-limit:]
+                has_older = bool(items) and bool(self._store.query(limit=1, before=items[-1]["seq"], **filters))
+            else:
+                rows = self._store.query(limit=limit + 1, before=seq, **filters)
+                has_older, items = len(rows) > limit, rows[:limit]
+                has_newer = bool(items) and seq is not None and bool(self._store.query(limit=1, after=items[0]["seq"], **filters))
+            total = self._store.count(TOTAL_HINT_CAP, **filters)
+        return {
+            "items": items,
+            "next_cursor": encode_cursor("before", items[-1]["seq"]) if has_older else None,
+            "prev_cursor": encode_cursor("after", items[0]["seq"]) if has_newer else None,
+            "total": total,
+            "total_exact": total < TOTAL_HINT_CAP,
+        }
+
+    def iter_history(self, batch_size: int = 500, **filters) -> Iterator[dict]:
+        """
+        Every matching entry, oldest first. The store is read in keyset batches
+        and locked only per batch, so a slow consumer never blocks writers and
+        memory stays bounded by `batch_size`.
+        """
+        filters["start"], filters["end"] = parse_timestamp(filters.get("start")), parse_timestamp(filters.get("end"))
+        self.flush()
+        after = 0
+        while True:
+            with self._store_lock:
+                batch = self._store.query(limit=batch_size, after=after, **filters)
+            if not batch:
+                return
+            yield from reversed(batch)
+            after = batch[0]["seq"]
+
+    def export(self, fmt: str = "ndjson", **filters) -> Tuple[Iterator[str], str, str]:
+        """
+        Returns (chunks, media_type, filename) for a streamed NDJSON or CSV export.
+        Filters are those of get_page(); invalid ones raise ValueError up front.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        parse_timestamp(filters.get("start"))
+        parse_timestamp(filters.get("end"))
+        entries = self.iter_history(**filters)
+
+        def ndjson():
+            lines = []
+            for entry in entries:
+                lines.append(json.dumps(entry) + "\n")
+                if len(lines) == 200:
+                    yield "".join(lines)
+                    lines = []
+            if lines:
+                yield "".join(lines)
+
+        def csv_rows():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(CSV_COLUMNS)
+            for count, entry in enumerate(entries, start=1):
+                writer.writerow([json.dumps(entry.get("details") or {}) if column == "details" else entry.get(column) for column in CSV_COLUMNS])
+                if count % 200 == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
+        filename = f"lighthouse-history-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{fmt}"
+        return (ndjson() if fmt == "ndjson" else csv_rows()), EXPORT_FORMATS[fmt], filename
+
+    def get_stats(self) -> dict:
+        """Per-container, per-action and per-day aggregates (see HistoryStats)."""
+        self.flush()
+        return self.stats.snapshot()
 
     def clear(self):
-        self._history = []
-        self._save()
+        with self._store_lock:
+            with self._lock:
+                self._pending = []
+                self.generation = self.cleared_generation = self.generations.next()
+            self.stats.reset()
+            try:
+                self._store.clear()
+            except Exception as e:
+                logger.error(f"Failed to save history: {e}")
+        if self.broker:
+            self.broker.publish("history_cleared", {})
+
+    def close(self):
+        """Stop the writer, commit anything still queued and close the store."""
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._store_lock:
+            self._store.close()
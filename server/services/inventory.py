@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import docker
+
+from services.generation import GenerationCounter
+
+logger = logging.getLogger(__name__)
+
+# Container event actions that can change what we show or check.
+WATCHED_ACTIONS = {
+    "create", "start", "restart", "stop", "die", "kill", "pause", "unpause",
+    "rename", "update", "destroy", "health_status",
+}
+
+
+class ContainerInventory:
+    """
+    In-memory model of all containers, loaded once from the daemon and then kept
+    current from the Docker events stream. Listing, scans and bulk updates read
+    from here instead of re-listing containers. If the stream drops, the
+    inventory reconnects and resyncs from a fresh snapshot.
+    """
+
+    def __init__(
+        self,
+        client,
+        reconnect_delay: float = 5.0,
+        on_change: Optional[Callable[[str, Optional[dict]], None]] = None,
+        generations: Optional[GenerationCounter] = None,
+        max_tombstones: int = 1000,
+    ):
+        self.client = client
+        self.reconnect_delay = reconnect_delay
+        # Called with ("upsert", attrs), ("remove", attrs) or ("resync", None).
+        self.on_change = on_change
+        self.generations = generations or GenerationCounter()
+        self.generation = 0
+        self._by_id: Dict[str, dict] = {}
+        self._by_name: Dict[str, str] = {}
+        # Generation each container was last changed / first seen, plus removal
+        # tombstones for ?since= deltas. Deltas older than the floor need a full reply.
+        self._changed_gen: Dict[str, int] = {}
+        self._added_gen: Dict[str, int] = {}
+        self._tombstones: deque = deque(maxlen=max_tombstones)
+        self._tombstone_floor = 0
+        self._lock = threading.Lock()
+        self._stream = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.synced_at: Optional[float] = None
+
+    def start(self):
+        since = int(time.time())
+        self.resync()
+        self._thread = threading.Thread(target=self._watch, args=(since,), name="lighthouse-inventory", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def resync(self):
+        """Replace the model with a fresh snapshot from the daemon."""
+        fresh = {}
+        for summary in self.client.api.containers(all=True):
+            try:
+                fresh[summary["Id"]] = self.client.api.inspect_container(summary["Id"])
+            except docker.errors.NotFound:
+                continue
+        with self._lock:
+            generation = self.generations.next()
+            for container_id in set(self._by_id) - set(fresh):
+                self._add_tombstone(generation, container_id)
+            self._by_id = fresh
+            self._by_name = {attrs["Name"].lstrip("/"): container_id for container_id, attrs in fresh.items()}
+            self._changed_gen = {container_id: generation for container_id in fresh}
+            self._added_gen = {container_id: self._added_gen.get(container_id, generation) for container_id in fresh}
+            self.generation = generation
+        self.synced_at = time.time()
+        logger.info(f"Container inventory synced ({len(fresh)} containers)")
+        self._notify("resync", None)
+
+    def _add_tombstone(self, generation: int, container_id: str):
+        # Caller holds the lock.
+        if len(self._tombstones) == self._tombstones.maxlen:
+            self._tombstone_floor = self._tombstones[0][0]
+        self._tombstones.append((generation, container_id))
+        self._changed_gen.pop(container_id, None)
+        self._added_gen.pop(container_id, None)
+
+    def _notify(self, action: str, attrs: Optional[dict]):
+        if not self.on_change:
+            return
+        try:
+            self.on_change(action, attrs)
+        except Exception as e:
+            logger.error(f"Inventory change listener failed: {e}")
+
+    def _watch(self, since: int):
+        while not self._stopped.is_set():
+            try:
+                self._stream = self.client.events(decode=True, filters={"type": "container"}, since=since)
+                for event in self._stream:
+                    self._handle_event(event)
+                    since = int(event.get("time") or since)
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                logger.warning(f"Docker events stream failed: {e}")
+            finally:
+                self._stream = None
+            if self._stopped.wait(self.reconnect_delay):
+                break
+            # Events may have been missed while disconnected.
+            try:
+                since = int(time.time())
+                self.resync()
+            except Exception as e:
+                logger.error(f"Container inventory resync failed: {e}")
+
+    def _handle_event(self, event: dict):
+        action = (event.get("Action") or event.get("status") or "").split(":", 1)[0]
+        container_id = event.get("id") or (event.get("Actor") or {}).get("ID")
+        if not container_id or action not in WATCHED_ACTIONS:
+            return
+        if action == "destroy":
+            self._remove(container_id)
+        else:
+            self.refresh(container_id)
+
+    def refresh(self, container_id: str):
+        """Re-inspect one container and update (or drop) its entry."""
+        try:
+            attrs = self.client.api.inspect_container(container_id)
+        except docker.errors.NotFound:
+            self._remove(container_id)
+            return
+        with self._lock:
+            previous = self._by_id.get(attrs["Id"])
+            if previous is not None:
+                self._by_name.pop(previous["Name"].lstrip("/"), None)
+            self._by_id[attrs["Id"]] = attrs
+            self._by_name[attrs["Name"].lstrip("/")] = attrs["Id"]
+            generation = self.generations.next()
+            self._changed_gen[attrs["Id"]] = generation
+            self._added_gen.setdefault(attrs["Id"], generation)
+            self.generation = generation
+        self._notify("upsert", attrs)
+
+    def _remove(self, container_id: str):
+        with self._lock:
+            attrs = self._by_id.pop(container_id, None)
+            if attrs is not None and self._by_name.get(attrs["Name"].lstrip("/")) == container_id:
+                self._by_name.pop(attrs["Name"].lstrip("/"), None)
+            if attrs is not None:
+                self.generation = self.generations.next()
+                self._add_tombstone(self.generation, container_id)
+        if attrs is not None:
+            self._notify("remove", attrs)
+
+    def get_attrs(self, key: str) -> Optional[dict]:
+        """Look up inspect data by full ID, name or ID prefix."""
+        with self._lock:
+            if key in self._by_id:
+                return self._by_id[key]
+            if key in self._by_name:
+                return self._by_id[self._by_name[key]]
+            matches = [attrs for container_id, attrs in self._by_id.items() if container_id.startswith(key)]
+        return matches[0] if len(matches) == 1 else None
+
+    def list_attrs(self) -> List[dict]:
+        with self._lock:
+            return list(self._by_id.values())
+
+    def containers(self) -> list:
+        """Container models built from cached inspect data (no daemon calls)."""
+        return [self.client.containers.prepare_model(attrs) for attrs in self.list_attrs()]
+
+    def touch(self, container_id: Optional[str] = None):
+        """Mark one container (or all) as changed, e.g. after its exclusion flag flips."""
+        with self._lock:
+            generation = self.generations.next()
+            targets = [container_id] if container_id else list(self._by_id)
+            for target in targets:
+                if target in self._by_id:
+                    self._changed_gen[target] = generation
+            self.generation = generation
+
+    def changes_since(self, since: int) -> dict:
+        """
+        Containers added, changed and removed after generation `since`.
+        `full` is True when the delta cannot be computed (cursor from a previous
+        process or older than the oldest tombstone) and the caller should send everything.
+        """
+        with self._lock:
+            if not self.generations.is_current(since) or since < self._tombstone_floor:
+                return {"full": True, "added": list(self._by_id.values()), "changed": [], "removed": []}
+            added, changed = [], []
+            for container_id, attrs in self._by_id.items():
+                if self._added_gen.get(container_id, 0) > since:
+                    added.append(attrs)
+                elif self._changed_gen.get(container_id, 0) > since:
+                    changed.append(attrs)
+            removed = [container_id for generation, container_id in self._tombstones if generation > since and container_id not in self._by_id]
+        return {"full": False, "added": added, "changed": changed, "removed": removed}
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class Job:
+    """One background run. Workers report progress through set_total()/add_result()."""
+
+    def __init__(self, kind: str, key: Optional[str] = None, params: Optional[dict] = None, on_change=None):
+        self.id = str(uuid4())
+        self.kind = kind
+        self.key = key
+        self.params = params or {}
+        self.status = "queued"
+        self.created_at = datetime.utcnow().isoformat() + "Z"
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.total: Optional[int] = None
+        self.results = []
+        self.summary: Optional[dict] = None
+        self.error: Optional[str] = None
+        self._on_change = on_change
+        self._lock = threading.Lock()
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change(self)
+
+    def set_total(self, total: int):
+        with self._lock:
+            self.total = total
+        self._changed()
+
+    def add_result(self, result: dict):
+        with self._lock:
+            self.results.append(result)
+        self._changed()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    def to_dict(self, include_results: bool = True) -> dict:
+        with self._lock:
+            data = {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "params": self.params,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "total": self.total,
+                "done": len(self.results),
+                "summary": self.summary,
+                "error": self.error,
+            }
+            if include_results:
+                data["results"] = list(self.results)
+        return data
+
+
+class JobManager:
+    """
+    Runs long operations (bulk and webhook updates) on a small bounded pool so
+    HTTP requests return immediately with a job ID. Jobs sharing a `key` are
+    exclusive: submitting while one is queued or running returns that job
+    instead of starting a second run. Finished jobs are kept for `max_finished`
+    lookups, oldest dropped first.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 50, broker=None):
+        self.broker = broker
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lighthouse-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_keys = {}
+        self._lock = threading.Lock()
+        self._published_at = {}
+
+    def _publish(self, job: Job, force: bool = False):
+        if not self.broker:
+            return
+        # Progress can be chatty on big fleets; state changes always go out.
+        now = time.monotonic()
+        if not force and now - self._published_at.get(job.id, 0) < 0.5:
+            return
+        self._published_at[job.id] = now
+        self.broker.publish("job", job.to_dict(include_results=False))
+
+    def submit(self, kind: str, fn: Callable[[Job], Optional[dict]], key: Optional[str] = None, params: Optional[dict] = None):
+        """
+        Queue fn(job). Returns (job, created); created is False when an active job
+        with the same key already exists and was returned instead.
+        """
+        with self._lock:
+            if key and key in self._active_keys:
+                return self._jobs[self._active_keys[key]], False
+            job = Job(kind, key=key, params=params, on_change=self._publish)
+            self._jobs[job.id] = job
+            if key:
+                self._active_keys[key] = job.id
+            self._trim()
+        self._publish(job, force=True)
+        self._executor.submit(self._run, job, fn)
+        return job, True
+
+    def _run(self, job: Job, fn: Callable[[Job], Optional[dict]]):
+        job.status = "running"
+        job.started_at = datetime.utcnow().isoformat() + "Z"
+        self._publish(job, force=True)
+        try:
+            job.summary = fn(job)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.error(f"Job {job.kind} {job.id} failed: {e}")
+            job.error = str(getattr(e, "detail", None) or e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.utcnow().isoformat() + "Z"
+            with self._lock:
+                if job.key and self._active_keys.get(job.key) == job.id:
+                    del self._active_keys[job.key]
+            self._publish(job, force=True)
+            self._published_at.pop(job.id, None)
+
+    def _trim(self):
+        # Caller holds the lock.
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict(include_results=False) for job in reversed(jobs)]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,344 @@
+import heapq
+import itertools
+import logging
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, List, Optional
+from uuid import uuid4
+
+from docker import auth
+from docker.utils import parse_repository_tag
+
+logger = logging.getLogger(__name__)
+
+# Layer statuses after which a layer's download is finished.
+DONE_STATUSES = ("Download complete", "Pull complete", "Already exists")
+
+# Queue order for pulls waiting for a slot: lower goes first, FIFO within a class.
+PRIORITIES = {"manual": 0, "update": 1, "scan": 2}
+# How often a queued pull re-checks the bandwidth budget while waiting.
+BUDGET_RECHECK_SECONDS = 1.0
+
+
+class PullStalled(Exception):
+    pass
+
+
+class PullCancelled(Exception):
+    pass
+
+
+class PullProgress:
+    """Aggregated progress of one image pull across all of its layers."""
+
+    def __init__(self, image: str, containers: Optional[List[str]] = None, priority: str = "scan"):
+        self.id = str(uuid4())
+        self.image = image
+        self.containers = list(containers or [])
+        self.priority = priority
+        self.status = "queued"
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.layers = {}
+        self.last_progress = time.monotonic()
+        self.throughput_bps = 0.0
+        self.rate_samples = 0
+        self._rate_mark = (time.monotonic(), 0)
+
+    @property
+    def bytes_done(self) -> int:
+        return sum(layer["current"] for layer in list(self.layers.values()))
+
+    @property
+    def bytes_total(self) -> int:
+        return sum(layer["total"] for layer in list(self.layers.values()))
+
+    def observe(self, event: dict) -> bool:
+        """Fold one daemon progress message in; returns True when it shows progress."""
+        layer_id = event.get("id")
+        status = event.get("status") or ""
+        if not layer_id or status.startswith(("Pulling from", "Digest:", "Status:")):
+            return False
+        layer = self.layers.setdefault(layer_id, {"status": None, "current": 0, "total": 0})
+        detail = event.get("progressDetail") or {}
+        progressed = status != layer["status"]
+        layer["status"] = status
+        if status == "Downloading" and detail.get("total"):
+            progressed = progressed or detail.get("current", 0) > layer["current"]
+            layer["current"] = detail.get("current", 0)
+            layer["total"] = detail["total"]
+        elif status in DONE_STATUSES:
+            layer["current"] = layer["total"]
+        elif status == "Extracting":
+            # Extraction reports its own counter; any movement counts as progress.
+            progressed = progressed or bool(detail.get("current"))
+        if progressed:
+            self.last_progress = time.monotonic()
+            self._update_rate()
+        return progressed
+
+    def _update_rate(self):
+        now, done = time.monotonic(), self.bytes_done
+        mark_time, mark_bytes = self._rate_mark
+        elapsed = now - mark_time
+        if elapsed >= 1.0:
+            rate = max(0.0, (done - mark_bytes) / elapsed)
+            # Smooth over bursty layer completions.
+            self.throughput_bps = rate if not self.throughput_bps else 0.7 * self.throughput_bps + 0.3 * rate
+            self._rate_mark = (now, done)
+            self.rate_samples += 1
+
+    def to_dict(self) -> dict:
+        done, total = self.bytes_done, self.bytes_total
+        remaining = max(0, total - done)
+        return {
+            "id": self.id,
+            "image": self.image,
+            "containers": self.containers,
+            "status": self.status,
+            "priority": self.priority,
+            "queued_at": datetime.utcfromtimestamp(self.queued_at).isoformat() + "Z",
+            "started_at": datetime.utcfromtimestamp(self.started_at).isoformat() + "Z" if self.started_at else None,
+            "finished_at": datetime.utcfromtimestamp(self.finished_at).isoformat() + "Z" if self.finished_at else None,
+            "layers": len(self.layers),
+            "layers_done": sum(1 for layer in list(self.layers.values()) if layer["status"] in DONE_STATUSES),
+            "bytes_done": done,
+            "bytes_total": total,
+            "percent": round(done * 100 / total, 1) if total else None,
+            "throughput_bps": round(self.throughput_bps),
+            "eta_seconds": round(remaining / self.throughput_bps) if self.throughput_bps and total else None,
+            "error": self.error,
+        }
+
+
+class PullMonitor:
+    """
+    Pulls images through the daemon's streaming progress API instead of the
+    blocking images.pull(). Per-layer progress is aggregated into bytes,
+    throughput and ETA, published as `pull` events and listed by active().
+    A pull that reports no progress for `pull_stall_timeout_seconds` is
+    aborted by closing its connection, which cancels it in the daemon.
+
+    Every pull goes through one queue: at most `max_concurrent_pulls` run at
+    once, waiting pulls start in priority order (manual, update, scan), and
+    with `pull_bandwidth_budget_bps` set no further pull starts while the
+    measured throughput of the running ones is at or over the budget.
+    """
+
+    def __init__(self, client, settings_manager=None, broker=None, publish_interval: float = 0.5, keep_finished: int = 20):
+        self.client = client
+        self.settings = settings_manager
+        self.broker = broker
+        self.publish_interval = publish_interval
+        self._active = {}
+        self._finished: deque = deque(maxlen=keep_finished)
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._waiting = []
+        self._running = 0
+        self._sequence = itertools.count()
+
+    def _stall_timeout(self) -> float:
+        if not self.settings:
+            return 120.0
+        return float(self.settings.get("pull_stall_timeout_seconds") or 120)
+
+    def _max_concurrent(self) -> int:
+        if not self.settings:
+            return 2
+        return max(1, int(self.settings.get("max_concurrent_pulls") or 1))
+
+    def _budget(self) -> float:
+        if not self.settings:
+            return 0.0
+        return float(self.settings.get("pull_bandwidth_budget_bps") or 0)
+
+    def _throughput(self) -> float:
+        # Caller holds the lock.
+        return sum(progress.throughput_bps for progress in self._active.values() if progress.status == "pulling")
+
+    def _can_start(self, ticket) -> bool:
+        # Caller holds the lock.
+        if self._waiting[0] != ticket or self._running >= self._max_concurrent():
+            return False
+        budget = self._budget()
+        if not budget or not self._running:
+            # One pull always runs, whatever the budget.
+            return True
+        running = [progress for progress in self._active.values() if progress.status == "pulling"]
+        # Wait for every running pull's first rate sample before judging the headroom.
+        return all(progress.rate_samples for progress in running) and self._throughput() < budget
+
+    def _acquire(self, progress: PullProgress, cancelled: Optional[Callable[[], bool]] = None):
+        """Block until the queue lets this pull start, or raise PullCancelled once cancelled() is true."""
+        ticket = (PRIORITIES.get(progress.priority, PRIORITIES["scan"]), next(self._sequence), progress.id)
+        with self._slots:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if cancelled and cancelled():
+                        raise PullCancelled(f"Pull of {progress.image} cancelled while queued")
+                    if self._can_start(ticket):
+                        break
+                    self._slots.wait(BUDGET_RECHECK_SECONDS)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+            self._running += 1
+            # Waiting in the queue is not a stall.
+            progress.status = "pulling"
+            progress.started_at = time.time()
+            progress.last_progress = time.monotonic()
+            progress._rate_mark = (progress.last_progress, 0)
+            self._slots.notify_all()
+
+    def _release(self):
+        with self._slots:
+            self._running -= 1
+            self._slots.notify_all()
+
+    def queue_info(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": len(self._waiting),
+                "max_concurrent": self._max_concurrent(),
+                "bandwidth_budget_bps": self._budget() or None,
+                "throughput_bps": round(self._throughput()),
+            }
+
+    def _publish(self, progress: PullProgress):
+        if self.broker:
+            self.broker.publish("pull", progress.to_dict())
+
+    def _open_stream(self, image_name: str, auth_config: Optional[dict]):
+        """
+        Start the pull and return the raw HTTP response. This mirrors
+        APIClient.pull(stream=True) but keeps hold of the response so a stalled
+        pull can be aborted.
+        """
+        api = self.client.api
+        repository, tag = parse_repository_tag(image_name)
+        headers = {}
+        if auth_config is None:
+            registry, _ = auth.resolve_repository_name(repository)
+            header = auth.get_config_header(api, registry)
+            if header:
+                headers["X-Registry-Auth"] = header
+        else:
+            headers["X-Registry-Auth"] = auth.encode_header(auth_config)
+        params = {"fromImage": repository, "tag": tag or "latest"}
+        response = api._post(api._url("/images/create"), params=params, headers=headers, stream=True, timeout=None)
+        api._raise_for_status(response)
+        return response
+
+    @staticmethod
+    def _abort(response):
+        try:
+            sock = response.raw._fp.fp.raw
+            getattr(sock, "_sock", sock).shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        try:
+            response.close()
+        except Exception:
+            pass
+
+    def pull(
+        self,
+        image_name: str,
+        auth_config: Optional[dict] = None,
+        containers: Optional[List[str]] = None,
+        priority: str = "scan",
+        cancelled: Optional[Callable[[], bool]] = None,
+    ):
+        """
+        Queue a pull of `image_name` at `priority` ("manual", "update" or "scan"),
+        then pull it with progress tracking and return the pulled Image. While it
+        is queued, cancelled() is polled and a true result abandons the pull; a
+        pull that has started runs to completion.
+        """
+        progress = PullProgress(image_name, containers, priority)
+        with self._lock:
+            self._active[progress.id] = progress
+        # The entry leaves _active however the pull ends, including while still queued.
+        acquired = False
+        try:
+            self._publish(progress)
+            self._acquire(progress, cancelled)
+            acquired = True
+            self._publish(progress)
+            self._stream(progress, image_name, auth_config)
+            progress.status = "complete"
+        except PullCancelled as e:
+            progress.status, progress.error = "cancelled", str(e)
+            raise
+        except PullStalled as e:
+            progress.status, progress.error = "stalled", str(e)
+            raise
+        except Exception as e:
+            progress.status, progress.error = "failed", str(e)
+            raise
+        finally:
+            progress.finished_at = time.time()
+            with self._lock:
+                self._active.pop(progress.id, None)
+                self._finished.append(progress)
+            if acquired:
+                self._release()
+            self._publish(progress)
+
+        repository, tag = parse_repository_tag(image_name)
+        tag = tag or "latest"
+        return self.client.images.get(f"{repository}{'@' if tag.startswith('sha256:') else ':'}{tag}")
+
+    def _stream(self, progress: PullProgress, image_name: str, auth_config: Optional[dict]):
+        response = self._open_stream(image_name, auth_config)
+        events: queue.Queue = queue.Queue()
+
+        def reader():
+            # Reads on its own thread so a silent connection cannot block the stall check.
+            try:
+                for event in self.client.api._stream_helper(response, decode=True):
+                    events.put(("event", event))
+                events.put(("done", None))
+            except Exception as e:
+                events.put(("error", e))
+
+        threading.Thread(target=reader, name="lighthouse-pull", daemon=True).start()
+        stall_timeout = self._stall_timeout()
+        published = 0.0
+        while True:
+            waited = time.monotonic() - progress.last_progress
+            try:
+                kind, payload = events.get(timeout=max(0.1, stall_timeout - waited))
+            except queue.Empty:
+                if time.monotonic() - progress.last_progress < stall_timeout:
+                    continue
+                self._abort(response)
+                raise PullStalled(f"No pull progress for {int(stall_timeout)}s; pull aborted")
+            if kind == "done":
+                return
+            if kind == "error":
+                raise payload
+            if payload.get("error"):
+                raise RuntimeError(payload["error"])
+            progress.observe(payload)
+            now = time.monotonic()
+            if now - published >= self.publish_interval:
+                published = now
+                self._publish(progress)
+
+    def active(self) -> List[dict]:
+        """Running and queued pulls followed by the most recently finished ones."""
+        with self._lock:
+            running = [progress.to_dict() for progress in self._active.values()]
+            running.sort(key=lambda pull: pull["status"] != "pulling")
+            finished = [progress.to_dict() for progress in reversed(self._finished)]
+        return running + finished
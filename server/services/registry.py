@@ -0,0 +1,484 @@
+import base64
+import hashlib
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DOCKER_HUB_DOMAIN = "docker.io"
+DOCKER_HUB_API_HOST = "registry-1.docker.io"
+
+MANIFEST_MEDIA_TYPES = [
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+]
+INDEX_MEDIA_TYPES = {
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+}
+
+_CHALLENGE_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+# Token lifetime assumed by the distribution spec when `expires_in` is omitted.
+DEFAULT_TOKEN_TTL = 60
+
+# 429/503 handling: retry waits up to MAX_INLINE_WAIT seconds, longer waits mark the registry as blocked.
+MAX_RETRIES = 3
+MAX_INLINE_WAIT = 30
+MAX_BACKOFF = 300
+
+
+class RegistryError(Exception):
+    """Raised when a registry lookup cannot be completed."""
+
+
+class RegistryRateLimited(RegistryError):
+    """Raised when a registry is rate limiting us; pulling from it instead would only spend more quota."""
+
+
+class ImageReference:
+    """
+    A parsed image reference, normalised the same way the Docker CLI does it
+    (``nginx`` -> ``docker.io/library/nginx:latest``).
+    """
+
+    def __init__(self, domain: str, repository: str, tag: Optional[str] = None, digest: Optional[str] = None):
+        self.domain = domain
+        self.repository = repository
+        self.tag = tag
+        self.digest = digest
+
+    @classmethod
+    def parse(cls, image_name: str) -> "ImageReference":
+        name = (image_name or "").strip()
+        if not name:
+            raise RegistryError("Empty image reference")
+
+        digest = None
+        if "@" in name:
+            name, digest = name.split("@", 1)
+
+        tag = None
+        last = name.rsplit("/", 1)[-1]
+        if ":" in last:
+            name, tag = name.rsplit(":", 1)
+
+        parts = name.split("/", 1)
+        if len(parts) == 2 and (any(ch in parts[0] for ch in [".", ":"]) or parts[0] == "localhost"):
+            domain, repository = parts[0].lower(), parts[1]
+        else:
+            domain, repository = DOCKER_HUB_DOMAIN, name
+
+        if domain in {"index.docker.io", "registry-1.docker.io"}:
+            domain = DOCKER_HUB_DOMAIN
+        if domain == DOCKER_HUB_DOMAIN and "/" not in repository:
+            repository = f"library/{repository}"
+
+        if not tag and not digest:
+            tag = "latest"
+        return cls(domain, repository, tag, digest)
+
+    @property
+    def api_host(self) -> str:
+        return DOCKER_HUB_API_HOST if self.domain == DOCKER_HUB_DOMAIN else self.domain
+
+    @property
+    def name(self) -> str:
+        return f"{self.domain}/{self.repository}"
+
+    @property
+    def reference(self) -> str:
+        return self.digest or self.tag
+
+    def __str__(self):
+        suffix = f"@{self.digest}" if self.digest else f":{self.tag}"
+        return f"{self.name}{suffix}"
+
+
+def local_repo_digests(repo_digests: Iterable[str], ref: ImageReference) -> List[str]:
+    """Return the digests from an image's ``RepoDigests`` that belong to ``ref``'s repository."""
+    digests = []
+    for entry in repo_digests or []:
+        if "@" not in entry:
+            continue
+        try:
+            candidate = ImageReference.parse(entry)
+        except RegistryError:
+            continue
+        if candidate.name == ref.name and candidate.digest:
+            digests.append(candidate.digest)
+    return digests
+
+
+def _parse_challenge(header: str) -> Tuple[str, dict]:
+    scheme, _, params = (header or "").partition(" ")
+    return scheme.strip().lower(), dict(_CHALLENGE_PARAM.findall(params))
+
+
+class TokenCache:
+    """
+    Bearer tokens keyed by (registry, scope, credentials). Entries honour the
+    token endpoint's `expires_in` and are treated as stale shortly before they
+    expire, so callers refresh ahead of time. Concurrent callers for the same key
+    share a single handshake.
+    """
+
+    def __init__(self, refresh_margin: int = 10):
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[tuple, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[tuple, threading.Lock] = {}
+
+    @staticmethod
+    def make_key(registry: str, scope: str, credentials: Optional[Tuple[str, str]]) -> tuple:
+        fingerprint = None
+        if credentials:
+            fingerprint = hashlib.sha256(f"{credentials[0]}:{credentials[1]}".encode("utf-8")).hexdigest()
+        return registry, scope, fingerprint
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            entry = self._tokens.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def put(self, key: tuple, token: str, expires_in: Optional[int] = None):
+        lifetime = max(int(expires_in or DEFAULT_TOKEN_TTL), 1)
+        # Refresh ahead of expiry: whichever is larger of the fixed margin and 10% of the lifetime.
+        margin = min(max(self.refresh_margin, lifetime // 10), lifetime - 1)
+        with self._lock:
+            self._tokens[key] = (token, time.monotonic() + lifetime - margin)
+
+    def invalidate(self, key: tuple):
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    def get_or_fetch(self, key: tuple, fetch: Callable[[], Tuple[str, Optional[int]]]) -> str:
+        token = self.get(key)
+        if token:
+            return token
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            token = self.get(key)
+            if token:
+                return token
+            token, expires_in = fetch()
+            self.put(key, token, expires_in)
+            return token
+
+
+def _parse_rate_header(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Parse ``RateLimit-*`` values such as ``100;w=21600`` into (count, window_seconds)."""
+    if not value:
+        return None, None
+    count, window = None, None
+    for index, part in enumerate(value.split(",")[0].split(";")):
+        part = part.strip()
+        try:
+            if index == 0:
+                count = int(part)
+            elif part.startswith("w="):
+                window = int(part[2:])
+        except ValueError:
+            continue
+    return count, window
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except Exception:
+        return None
+
+
+class RateLimitState:
+    """Rate-limit bookkeeping for one registry host, fed from response headers."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.window: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.blocked_until: float = 0.0
+        self.failures = 0
+        self.requests = 0
+        self.throttled = 0
+        self.updated_at: Optional[float] = None
+
+    def observe(self, response: requests.Response):
+        self.requests += 1
+        self.updated_at = time.time()
+        limit, window = _parse_rate_header(response.headers.get("RateLimit-Limit"))
+        remaining, remaining_window = _parse_rate_header(response.headers.get("RateLimit-Remaining"))
+        if limit is not None:
+            self.limit = limit
+        if remaining is not None:
+            self.remaining = remaining
+        self.window = window or remaining_window or self.window
+        reset = response.headers.get("RateLimit-Reset")
+        if reset and reset.strip().isdigit():
+            self.reset_at = time.time() + int(reset.strip())
+        elif remaining is not None and self.window and remaining == 0:
+            self.reset_at = time.time() + self.window
+
+        if response.status_code in (429, 503):
+            self.throttled += 1
+            self.failures += 1
+            wait = _parse_retry_after(response.headers.get("Retry-After"))
+            if wait is None:
+                # Adaptive exponential backoff when the registry does not say how long to wait.
+                wait = min(2 ** self.failures, MAX_BACKOFF)
+            self.blocked_until = time.time() + wait
+            return wait
+        self.failures = 0
+        return None
+
+    def consume(self, count: int = 1):
+        """Account for requests made on our behalf (e.g. daemon pulls) that we cannot observe."""
+        if self.remaining is not None:
+            self.remaining = max(self.remaining - count, 0)
+
+    def has_budget(self, reserve: int = 0) -> bool:
+        now = time.time()
+        if self.blocked_until > now:
+            return False
+        if self.remaining is None:
+            return True
+        if self.reset_at and self.reset_at <= now:
+            # Window rolled over; trust the registry again until it tells us otherwise.
+            self.remaining = None
+            return True
+        return self.remaining > reserve
+
+    def snapshot(self) -> dict:
+        def iso(ts):
+            return datetime.utcfromtimestamp(ts).isoformat() + "Z" if ts else None
+
+        return {
+            "host": self.host,
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "window_seconds": self.window,
+            "reset_at": iso(self.reset_at),
+            "blocked_until": iso(self.blocked_until) if self.blocked_until > time.time() else None,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "updated_at": iso(self.updated_at),
+        }
+
+
+class RegistryClient:
+    """
+    Minimal Docker Registry HTTP API v2 client used for digest-only update checks.
+    Works against Docker Hub, GHCR and any v2 registry, including a plain-HTTP
+    registry on localhost (or listed in ``insecure_registries``).
+    """
+
+    def __init__(self, settings_manager, timeout: int = 15, token_cache: Optional[TokenCache] = None):
+        self.settings = settings_manager
+        self.timeout = timeout
+        self.tokens = token_cache or TokenCache()
+        # Last auth challenge seen per registry host, so tokens can be sent up front.
+        self._challenges: Dict[str, Tuple[str, dict]] = {}
+        # One keep-alive session (connection pool) and one rate-limit record per host.
+        self._sessions: Dict[str, requests.Session] = {}
+        self._limits: Dict[str, RateLimitState] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                pool_size = max(int(self.settings.get("registry_concurrency") or 1), 1)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def rate_limit(self, host: str) -> RateLimitState:
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = RateLimitState(host)
+            return self._limits[host]
+
+    def has_budget(self, image_name: str) -> bool:
+        """
+        Whether a check against `image_name`'s registry fits the remaining request
+        budget, keeping `registry_request_reserve` requests back for updates.
+        """
+        try:
+            host = ImageReference.parse(image_name).api_host
+        except RegistryError:
+            return True
+        return self.rate_limit(host).has_budget(int(self.settings.get("registry_request_reserve") or 0))
+
+    def note_pull(self, image_name: str):
+        """Charge a daemon pull against its registry's remaining quota."""
+        try:
+            self.rate_limit(ImageReference.parse(image_name).api_host).consume()
+        except RegistryError:
+            pass
+
+    def quota(self) -> List[dict]:
+        with self._lock:
+            limits = list(self._limits.values())
+        return [state.snapshot() for state in limits]
+
+    def _send(self, method: str, url: str, host: str, **kwargs) -> requests.Response:
+        """Issue a request on the host's pooled session, backing off on 429/503."""
+        state = self.rate_limit(host)
+        for attempt in range(MAX_RETRIES + 1):
+            wait = state.blocked_until - time.time()
+            if wait > MAX_INLINE_WAIT:
+                raise RegistryRateLimited(f"Registry {host} is rate limited for another {int(wait)}s")
+            if wait > 0:
+                time.sleep(wait)
+            response = self._session(host).request(method, url, timeout=self.timeout, **kwargs)
+            retry_after = state.observe(response)
+            if retry_after is None:
+                return response
+            logger.warning(f"Registry {host} answered HTTP {response.status_code}; backing off {retry_after:.0f}s")
+        raise RegistryRateLimited(f"Registry {host} is rate limiting requests (HTTP {response.status_code})")
+
+    def _scheme(self, host: str) -> str:
+        insecure = self.settings.get("insecure_registries") or []
+        hostname = host.split(":", 1)[0]
+        if host in insecure or hostname in {"localhost", "127.0.0.1"}:
+            return "http"
+        return "https"
+
+    def credentials(self, ref: ImageReference) -> Optional[Tuple[str, str]]:
+        """Configured (username, token) for Docker Hub or GHCR references, else None."""
+        provider = {DOCKER_HUB_DOMAIN: "dockerhub", "ghcr.io": "ghcr"}.get(ref.domain)
+        if not provider:
+            return None
+        username = self.settings.get(f"{provider}_username")
+        token = self.settings.get(f"{provider}_token")
+        if not username or not token:
+            return None
+        return username, token
+
+    def _fetch_token(self, challenge: dict, ref: ImageReference, scope: str) -> Tuple[str, Optional[int]]:
+        realm = challenge.get("realm")
+        if not realm:
+            raise RegistryError(f"Registry {ref.domain} sent a bearer challenge without a realm")
+        params = {"scope": scope}
+        if challenge.get("service"):
+            params["service"] = challenge["service"]
+        logger.info(f"Requesting registry token for {scope} from {realm}")
+        realm_host = requests.utils.urlparse(realm).netloc
+        response = self._send("GET", realm, realm_host, params=params, auth=self.credentials(ref))
+        if response.status_code != 200:
+            raise RegistryError(f"Token request to {realm} failed with HTTP {response.status_code}")
+        body = response.json()
+        token = body.get("token") or body.get("access_token")
+        if not token:
+            raise RegistryError(f"Token endpoint {realm} returned no token")
+        return token, body.get("expires_in")
+
+    def _authorization(self, ref: ImageReference) -> Tuple[Optional[dict], Optional[tuple]]:
+        """
+        Build request auth for `ref` from the last challenge seen for its host.
+        Returns (headers, token_cache_key); bearer tokens come from the shared cache.
+        """
+        scheme, challenge = self._challenges.get(ref.api_host, (None, {}))
+        credentials = self.credentials(ref)
+        if scheme == "bearer":
+            scope = f"repository:{ref.repository}:pull"
+            key = TokenCache.make_key(ref.api_host, scope, credentials)
+            token = self.tokens.get_or_fetch(key, lambda: self._fetch_token(challenge, ref, scope))
+            return {"Authorization": f"Bearer {token}"}, key
+        if scheme == "basic" and credentials:
+            basic = base64.b64encode(f"{credentials[0]}:{credentials[1]}".encode("utf-8")).decode("ascii")
+            return {"Authorization": f"Basic {basic}"}, None
+        return {}, None
+
+    def authenticate(self, ref: ImageReference) -> bool:
+        """
+        Make sure a valid token for `ref`'s pull scope is cached, probing the
+        registry for its auth challenge if it has not been seen yet. Raises
+        RegistryError when the configured credentials are rejected.
+        """
+        if ref.api_host not in self._challenges:
+            self._request("GET", ref, None, [])
+        return bool(self._authorization(ref)[0])
+
+    def _request(self, method: str, ref: ImageReference, reference: Optional[str], accept: List[str]) -> requests.Response:
+        base = f"{self._scheme(ref.api_host)}://{ref.api_host}/v2/"
+        url = f"{base}{ref.repository}/manifests/{reference}" if reference else base
+        headers = {"Accept": ", ".join(accept)} if accept else {}
+        auth_headers, token_key = self._authorization(ref)
+        response = self._send(method, url, ref.api_host, headers={**headers, **auth_headers})
+
+        if response.status_code == 401:
+            # First contact with this host, or the cached token was rejected.
+            if token_key:
+                self.tokens.invalidate(token_key)
+            self._challenges[ref.api_host] = _parse_challenge(response.headers.get("WWW-Authenticate", ""))
+            auth_headers, token_key = self._authorization(ref)
+            if auth_headers:
+                response = self._send(method, url, ref.api_host, headers={**headers, **auth_headers})
+
+        if not reference:
+            if response.status_code == 401:
+                raise RegistryError(f"Registry {ref.domain} rejected the configured credentials")
+            return response
+        if response.status_code == 404:
+            raise RegistryError(f"Manifest {ref} not found on {ref.domain}")
+        if response.status_code >= 400:
+            raise RegistryError(f"Registry {ref.domain} returned HTTP {response.status_code} for {ref}")
+        return response
+
+    def get_manifest_digest(self, ref: ImageReference) -> Tuple[str, str]:
+        """
+        Resolve the manifest digest for a tag without downloading any layers.
+        Returns (digest, media_type). Uses HEAD and falls back to GET for
+        registries that omit ``Docker-Content-Digest`` on HEAD.
+        """
+        response = self._request("HEAD", ref, ref.reference, MANIFEST_MEDIA_TYPES)
+        digest = response.headers.get("Docker-Content-Digest")
+        media_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if digest:
+            return digest, media_type
+
+        response = self._request("GET", ref, ref.reference, MANIFEST_MEDIA_TYPES)
+        digest = response.headers.get("Docker-Content-Digest") or "sha256:" + hashlib.sha256(response.content).hexdigest()
+        media_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        return digest, media_type
+
+    def get_platform_digest(self, ref: ImageReference, index_digest: str, os_name: str, architecture: str, variant: Optional[str] = None) -> Optional[str]:
+        """Pick the per-platform manifest digest out of a multi-arch index."""
+        response = self._request("GET", ref, index_digest, MANIFEST_MEDIA_TYPES)
+        try:
+            manifests = response.json().get("manifests") or []
+        except ValueError:
+            return None
+        for entry in manifests:
+            platform = entry.get("platform") or {}
+            if platform.get("os") != os_name or platform.get("architecture") != architecture:
+                continue
+            if variant and platform.get("variant") and platform.get("variant") != variant:
+                continue
+            return entry.get("digest")
+        return None
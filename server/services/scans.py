@@ -0,0 +1,152 @@
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ScanRun:
+    """One scan as seen by the coordinator: what triggered it, its progress and its cancel flag."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, trigger: str, names: Optional[set] = None, only_expired: bool = False, coalesced: int = 0):
+        self.id = next(self._ids)
+        self.trigger = trigger
+        self.names = names
+        self.only_expired = only_expired
+        self.coalesced = coalesced
+        self.started_at = datetime.utcnow().isoformat() + "Z"
+        self.phase = "starting"
+        self.done = 0
+        self.total = 0
+        self.current = None
+        self.finished_at = None
+        self._started = time.monotonic()
+        self._finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def update(self, phase: Optional[str] = None, done: Optional[int] = None, total: Optional[int] = None, container: Optional[str] = None, **_):
+        if phase is not None:
+            self.phase = phase
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        self.current = container
+
+    def finish(self):
+        self._finished = time.monotonic()
+        self.finished_at = datetime.utcnow().isoformat() + "Z"
+        self.current = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "containers": len(self.names) if self.names is not None else None,
+            "only_expired": self.only_expired,
+            "coalesced": self.coalesced,
+            "phase": self.phase,
+            "done": self.done,
+            "total": self.total,
+            "current": self.current,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round((self._finished or time.monotonic()) - self._started, 1),
+            "cancel_requested": self.cancelled,
+        }
+
+
+class ScanCoordinator:
+    """
+    Lets one scan run at a time. A trigger that arrives while a scan is running
+    does not start a second one: it is folded into a single pending scan (the
+    union of the requested containers, a full scan if either asked for one)
+    which the running thread starts as soon as it finishes. Cancellation is
+    cooperative: the scan checks `run.cancelled` between containers, and a
+    cancel also drops the pending scan, handing the containers it named to
+    on_dropped(names) so they can be put back on the schedule.
+    """
+
+    def __init__(self, on_dropped: Optional[Callable[[set], None]] = None):
+        self.current: Optional[ScanRun] = None
+        self.last: Optional[dict] = None
+        self.on_dropped = on_dropped
+        self._pending: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def _merge(self, trigger: str, names: Optional[set], only_expired: bool):
+        # Caller holds the lock. Named containers are kept even once the scan is a
+        # full one, so a cancel can still hand them back.
+        pending = self._pending
+        if pending is None:
+            self._pending = {"trigger": trigger, "names": set(names or ()), "full": names is None, "only_expired": only_expired, "coalesced": 0}
+            return
+        pending["names"] |= set(names or ())
+        pending["full"] = pending["full"] or names is None
+        pending["only_expired"] = pending["only_expired"] and only_expired
+        pending["coalesced"] += 1
+
+    @staticmethod
+    def _start(pending: dict) -> ScanRun:
+        names = None if pending["full"] else pending["names"]
+        return ScanRun(pending["trigger"], names, pending["only_expired"], pending["coalesced"])
+
+    def submit(self, scan: Callable[[ScanRun], None], trigger: str, names: Optional[set] = None, only_expired: bool = False) -> bool:
+        """
+        Run scan(run) on the calling thread, or queue it behind the running scan.
+        Returns True when this call ran it (and any scans queued meanwhile).
+        """
+        with self._lock:
+            if self.current is not None:
+                self._merge(trigger, names, only_expired)
+                logger.info(f"Scan already running; {trigger} scan queued behind it")
+                return False
+            run = self.current = ScanRun(trigger, names, only_expired)
+        while run is not None:
+            try:
+                scan(run)
+            except Exception as e:
+                logger.error(f"Scan {run.id} failed: {e}")
+            run.finish()
+            with self._lock:
+                self.last = run.to_dict()
+                pending, self._pending = self._pending, None
+                run = self.current = self._start(pending) if pending else None
+        return True
+
+    def cancel(self) -> Optional[dict]:
+        """Ask the running scan to stop and drop the queued one; None when nothing is running."""
+        with self._lock:
+            if self.current is None:
+                return None
+            self.current.cancel()
+            dropped, self._pending = self._pending, None
+            logger.info(f"Cancellation requested for scan {self.current.id}")
+            scan = self.current.to_dict()
+        if dropped and dropped["names"] and self.on_dropped:
+            self.on_dropped(dropped["names"])
+        return scan
+
+    def progress(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.current.to_dict() if self.current else None,
+                "queued": {
+                    "trigger": self._pending["trigger"],
+                    "containers": None if self._pending["full"] else len(self._pending["names"]),
+                    "coalesced": self._pending["coalesced"],
+                } if self._pending else None,
+                "last": self.last,
+            }
@@ -1,12 +1,31 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.check_schedule import CheckSchedule
+from services.churn import ImageChurn, observed_version
+from services.cleanup import retained_name
+from services.compose import BatchUpdater
+from services.registry import ImageReference
+from services.scans import ScanCoordinator, ScanRun
 from services.settings import SettingsManager
-from services.updater import UpdateService
+from services.updater import UpdateService, group_by_image
 from datetime import datetime
+from typing import Optional, Tuple
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# How often expired retained containers are looked for.
+REAP_INTERVAL_MINUTES = 15
+# How often the check schedule is polled for containers that have fallen due.
+DUE_TICK_SECONDS = 60
+# Checks deferred for lack of registry budget are retried this soon instead of a full interval later.
+DEFERRED_RETRY_SECONDS = 300
+# Summary counters summed across due batches for the rolled-up history entry.
+ROLLUP_COUNTS = ("checked", "skipped", "errors", "updates_available", "updated", "deferred", "fresh", "registry_lookups_saved", "duration_seconds")
+
 from services.cache import StatusCache
 
 class SchedulerService:
@@ -17,6 +36,10 @@ class SchedulerService:
         status_cache: StatusCache,
         notifier=None,
         history=None,
+        inventory=None,
+        broker=None,
+        collector=None,
+        retained=None,
     ):
         self.scheduler = BackgroundScheduler()
         self.settings = settings_manager
@@ -24,9 +47,24 @@ class SchedulerService:
         self.cache = status_cache
         self.notifier = notifier
         self.history = history
+        self.inventory = inventory
+        self.broker = broker
+        self.collector = collector
+        self.retained = retained
+        self.batch = BatchUpdater(update_service, settings_manager)
+        self.churn = ImageChurn(settings_manager)
+        self.plan = CheckSchedule(settings_manager, self.churn)
+        # Cached statuses go stale on each container's own schedule, not the global interval.
+        self.cache.interval_for = self.plan.max_gap
+        self.scans = ScanCoordinator(on_dropped=self._requeue)
         self.job = None
+        self._last_cleanup = 0.0
+        # Due batches are small and frequent; their summaries are recorded once per default interval.
+        self._due_rollup = None
+        self._rollup_lock = threading.Lock()
         self.last_check_time = None
         self.next_check_time = None
+        self.last_scan_summary = None
 
     def _record(self, **payload):
         """Safely record a history entry if a history service is available."""
@@ -37,123 +75,296 @@ class SchedulerService:
         except Exception as e:
             logger.error(f"Failed to record history entry: {e}")
 
+    def _publish(self, **payload):
+        run = self.scans.current
+        if run:
+            run.update(**payload)
+            payload["scan_id"] = run.id
+        if self.broker:
+            self.broker.publish("scan", payload)
+
     def start(self):
+        if self.history:
+            try:
+                self.churn.seed(self.history.iter_history(), self.cache.get_all())
+            except Exception as e:
+                logger.error(f"Learning image change rates from history failed: {e}")
+        try:
+            self.plan.sync(self._listed())
+        except Exception as e:
+            logger.error(f"Building the check schedule failed: {e}")
         self.scheduler.start()
         self.schedule_job()
         # Schedule an immediate scan so the UI has data right away
-        self.scheduler.add_job(self.run_scheduled_scan, 'date', run_date=datetime.now(), id="initial_scan")
+        # Entries restored from the status cache snapshot are still fresh, so only refresh expired ones.
+        self.scheduler.add_job(self.run_scheduled_scan, 'date', run_date=datetime.now(), id="initial_scan", kwargs={"only_expired": True, "trigger": "startup"})
+        if self.retained:
+            self.scheduler.add_job(self.reap_retained, trigger=IntervalTrigger(minutes=REAP_INTERVAL_MINUTES), id="reap_retained", replace_existing=True)
         logger.info("Scheduler started.")
 
     def schedule_job(self):
-        # Remove existing job if any
-        if self.job:
-            self.job.remove()
-        
         interval = self.settings.get("check_interval_minutes")
-        logger.info(f"Scheduling scan every {interval} minutes.")
+        logger.info(f"Checking containers as they fall due (default interval {interval} minutes).")
         
+        # Checks are spread over each container's interval by the check schedule;
+        # the tick only picks up whatever has fallen due. A changed default interval
+        # is re-spread on the next tick. Replacing the job never starts a second
+        # tick; ticks that overlap a running scan are queued by the coordinator.
         self.job = self.scheduler.add_job(
-            self.run_scheduled_scan,
-            trigger=IntervalTrigger(minutes=int(interval)),
+            self.run_due_checks,
+            trigger=IntervalTrigger(seconds=DUE_TICK_SECONDS),
             id="auto_scan",
-            replace_existing=True
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
         )
-        self.next_check_time = self.job.next_run_time.isoformat() if self.job.next_run_time else None
+        self._update_next_check()
+
+    def _update_next_check(self):
+        due = self.plan.next_due()
+        self.next_check_time = datetime.utcfromtimestamp(due).isoformat() + "Z" if due else None
+
+    def _listed(self) -> list:
+        if self.inventory:
+            listed = self.inventory.containers()
+        else:
+            listed = self.updater.client.containers.list(all=True)
+        # Stopped previous containers kept for rollback are not deployments.
+        return [container for container in listed if not retained_name(container.name)]
+
+    def run_due_checks(self):
+        """Check the containers whose next check has fallen due, and reschedule them."""
+        try:
+            listed = self._listed()
+        except Exception as e:
+            logger.error(f"Listing containers for due checks failed: {e}")
+            return
+        self.plan.sync(listed)
+        due = set(self.plan.pop_due())
+        if due:
+            # Containers sharing a due container's image ride along: the lookup is shared anyway.
+            images = {container.attrs['Config']['Image'] for container in listed if container.name in due}
+            for container in listed:
+                if container.name not in due and container.attrs['Config']['Image'] in images:
+                    self.plan.reschedule(container.name)
+                    due.add(container.name)
+            self.run_scheduled_scan(names=due, trigger="due")
+        self._update_next_check()
+
+    def _registry_key(self, image_name: str) -> str:
+        try:
+            return ImageReference.parse(image_name).domain
+        except Exception:
+            return "unknown"
+
+    def _check_containers(self, containers, run: Optional[ScanRun] = None) -> Tuple[dict, int]:
+        """
+        Run the check phase on a bounded worker pool.
+        Containers are grouped by image reference and each reference is resolved
+        once, then fanned out to every container using it.
+        `scan_concurrency` caps the total number of in-flight lookups and
+        `registry_concurrency` caps the lookups against any single registry.
+        Returns ({container.id: result}, registry lookups saved); results are applied by the caller.
+        Once `run` is cancelled, images not yet looked up are left out of the results.
+        """
+        workers = max(1, int(self.settings.get("scan_concurrency") or 1))
+        per_registry = max(1, int(self.settings.get("registry_concurrency") or workers))
+        groups = group_by_image(containers)
+        registry_slots = {}
+        for image_name in groups:
+            key = self._registry_key(image_name)
+            if key not in registry_slots:
+                registry_slots[key] = threading.BoundedSemaphore(per_registry)
+
+        def check(image_name):
+            if run and run.cancelled:
+                return {}
+            if not self.updater.registry.has_budget(image_name):
+                deferred = {"update_available": False, "deferred": True, "reason": "Registry request budget exhausted; check deferred"}
+                return {c.id: deferred for c in groups[image_name]}
+            with registry_slots[self._registry_key(image_name)]:
+                started = time.monotonic()
+                lookup = self.updater.resolve_image(image_name, containers=[c.name for c in groups[image_name]])
+                resolved_ms = (time.monotonic() - started) * 1000
+                checked = {}
+                for c in groups[image_name]:
+                    check_started = time.monotonic()
+                    result = self.updater.check_container(c, lookup)
+                    # The shared lookup counts towards every container's check latency.
+                    result["duration_ms"] = round(resolved_ms + (time.monotonic() - check_started) * 1000, 1)
+                    checked[c.id] = result
+                return checked
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lighthouse-scan") as pool:
+            futures = {pool.submit(check, image_name): image_name for image_name in groups}
+            for future in as_completed(futures):
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    for container in groups[futures[future]]:
+                        results[container.id] = {"error": str(e), "update_available": False}
+                self._publish(phase="checking", done=len(results), total=len(containers))
+        return results, len(containers) - len(groups)
+
+    def _apply_result(self, container, result: dict, auto_update: bool, to_update: list):
+        """
+        Record a check result and auto-update if enabled. Runs on the scan thread only.
+        Containers to auto-update are appended to `to_update`.
+        """
+        if result.get("deferred"):
+            # Keep the previous status and retry shortly, rather than a full interval later.
+            self.plan.mark_due([container.name], delay=DEFERRED_RETRY_SECONDS)
+            self._record(
+                action="auto_scan",
+                status="deferred",
+                message=result.get("reason"),
+                container=container.name,
+                trigger="auto",
+            )
+            return
+
+        # Update cache
+        self.cache.update(container.name, result)
+        self.churn.observe(result.get("image"), observed_version(result))
+
+        if result.get("error"):
+            self._record(
+                action="auto_scan",
+                status="error",
+                message=result.get("error"),
+                container=container.name,
+                trigger="auto",
+            )
+            return
+
+        if result.get("update_available"):
+            logger.info(f"Update available for {container.name}")
+            if auto_update:
+                # Applied after the apply loop, grouped by compose project.
+                to_update.append((container, result))
+            else:
+                self._record(
+                    action="auto_scan",
+                    status="update_available",
+                    message="Update available; auto-update disabled",
+                    container=container.name,
+                    trigger="auto",
+                    details={"image": result.get("image"), "latest_id": result.get("latest_id"), "latest_digest": result.get("latest_digest")},
+                )
+
+    def _apply_update(self, container, result: dict, update_res: dict):
+        """Record one auto-update outcome. Called from BatchUpdater worker threads."""
+        logger.info(f"Update result for {container.name}: {update_res}")
+        if update_res.get("success"):
+            self.cache.update(container.name, {
+                "update_available": False,
+                "latest_id": update_res.get("new_id"),
+            })
+            self._record(
+                action="auto_update",
+                status="updated",
+                message=update_res.get("message", "Updated successfully"),
+                container=container.name,
+                trigger="auto",
+                details={"image": result.get("image"), "new_id": update_res.get("new_id"), "downtime_ms": update_res.get("downtime_ms")},
+            )
+        else:
+            if self.notifier:
+                try:
+                    self.notifier.send_update_notification(container.name, {**update_res, "success": False, "message": update_res.get("error", "Update failed")})
+                except Exception as notify_err:
+                    logger.error(f"Notification failed for {container.name}: {notify_err}")
+            self._record(
+                action="auto_update",
+                status="error",
+                message=update_res.get("error", "Update failed"),
+                container=container.name,
+                trigger="auto",
+                details={
+                    "image": result.get("image"),
+                    "downtime_ms": update_res.get("downtime_ms"),
+                    "rolled_back": update_res.get("rolled_back"),
+                },
+            )
+        if self.notifier:
+            try:
+                self.notifier.send_update_notification(container.name, update_res)
+            except Exception as notify_err:
+                logger.error(f"Notification failed for {container.name}: {notify_err}")
+
+    def run_scheduled_scan(self, only_expired: bool = False, names: Optional[set] = None, trigger: str = "scheduled") -> bool:
+        """
+        Check every container (or only those in `names`) and apply results. With
+        only_expired=True (warm start), containers whose cached status is still
+        within its TTL are left alone. Only one scan runs at a time; a call made
+        while one is running is queued behind it and returns False straight away.
+        """
+        return self.scans.submit(self._scan, trigger, names=names, only_expired=only_expired)
 
-    def run_scheduled_scan(self):
-        logger.info("Running scheduled scan...")
+    def cancel_scan(self) -> Optional[dict]:
+        """Stop the running scan between containers; None when no scan is running."""
+        return self.scans.cancel()
+
+    def _requeue(self, names: set):
+        """Containers taken off the check schedule but never checked are due again at once."""
+        self.plan.mark_due(names)
+        self._update_next_check()
+
+    def _scan(self, run: ScanRun):
+        only_expired, names = run.only_expired, run.names
+        logger.info(f"Running {run.trigger} scan...")
+        started = time.monotonic()
         self.last_check_time = datetime.utcnow().isoformat()
         auto_update = self.settings.get("auto_update_enabled")
         cleanup = self.settings.get("cleanup_enabled")
-        
-        # 1. List all containers
-        # We need a way to enlist containers.
-        # But UpdateService doesn't have list_containers.
-        # We should probably expose list_containers in UpdateService or reuse client.
+        summary = {"checked": 0, "skipped": 0, "errors": 0, "updates_available": 0, "updated": 0, "deferred": 0, "fresh": 0, "registry_lookups_saved": 0}
+        to_update = []
+        containers, results = [], {}
+
         try:
-            containers = self.updater.client.containers.list(all=True)
-            for container in containers:
+            # 1. List all containers and drop exclusions
+            containers = []
+            listed = self._listed()
+            for container in listed:
+                if names is not None and container.name not in names:
+                    continue
+                if self.settings.is_excluded(container.name):
+                    summary["skipped"] += 1
+                    self.cache.update(container.name, {"update_available": False, "skipped": True, "reason": "Container excluded from updates"})
+                    self._record(
+                        action="auto_scan",
+                        status="skipped",
+                        message="Container excluded from updates",
+                        container=container.name,
+                        trigger="auto",
+                    )
+                    continue
+                if only_expired and self.cache.is_fresh(container.name):
+                    summary["fresh"] += 1
+                    continue
+                containers.append(container)
+
+            # 2. Check in parallel
+            self._publish(phase="checking", done=0, total=len(containers))
+            results, summary["registry_lookups_saved"] = self._check_containers(containers, run)
+
+            # 3. Apply results serially, in list order, so cache/history writes stay consistent
+            for done, container in enumerate(containers, start=1):
+                result = results.get(container.id)
+                if result is None:
+                    # Not looked up before the scan was cancelled; lookups already made are still applied.
+                    continue
+                summary["checked"] += 1
+                self._publish(phase="applying", done=done, total=len(containers), container=container.name)
+                if result.get("deferred"):
+                    summary["deferred"] += 1
+                elif result.get("error"):
+                    summary["errors"] += 1
+                elif result.get("update_available"):
+                    summary["updates_available"] += 1
                 try:
-                    if self.settings.is_excluded(container.name):
-                        self.cache.update(container.id, {"update_available": False, "skipped": True, "reason": "Container excluded from updates"})
-                        self._record(
-                            action="auto_scan",
-                            status="skipped",
-                            message="Container excluded from updates",
-                            container=container.name,
-                            trigger="auto",
-                        )
-                        continue
-
-                    # Check for update
-                    result = self.updater.check_for_update(container.id)
-                    # Update cache
-                    self.cache.update(container.id, result)
-                    
-                    if result.get("error"):
-                        self._record(
-                            action="auto_scan",
-                            status="error",
-                            message=result.get("error"),
-                            container=container.name,
-                            trigger="auto",
-                        )
-                        continue
-
-                    if result.get("update_available"):
-                        logger.info(f"Update available for {container.name}")
-                        if auto_update:
-                            logger.info(f"Auto-updating {container.name}...")
-                            update_res = self.updater.update_container(container.id)
-                            logger.info(f"Update result: {update_res}")
-                            if update_res.get("success"):
-                                self.cache.update(container.name, {
-                                    "update_available": False,
-                                    "latest_id": update_res.get("new_id"),
-                                })
-                                self._record(
-                                    action="auto_update",
-                                    status="updated",
-                                    message=update_res.get("message", "Updated successfully"),
-                                    container=container.name,
-                                    trigger="auto",
-                                    details={"image": result.get("image"), "new_id": update_res.get("new_id")},
-                                )
-                            else:
-                                if self.notifier:
-                                    try:
-                                        self.notifier.send_update_notification(container.name, {**update_res, "success": False, "message": update_res.get("error", "Update failed")})
-                                    except Exception as notify_err:
-                                        logger.error(f"Notification failed for {container.name}: {notify_err}")
-                                self._record(
-                                    action="auto_update",
-                                    status="error",
-                                    message=update_res.get("error", "Update failed"),
-                                    container=container.name,
-                                    trigger="auto",
-                                    details={"image": result.get("image")},
-                                )
-                            if self.notifier:
-                                try:
-                                    self.notifier.send_update_notification(container.name, update_res)
-                                except Exception as notify_err:
-                                    logger.error(f"Notification failed for {container.name}: {notify_err}")
-                            
-                            if update_res.get("success") and cleanup:
-                                # Prune old image?
-                                # This is tricky because we need the old ID.
-                                # UpdateService returns new_id, but handles removal of old container.
-                                # Image prunning is separate.
-                                pass
-                        else:
-                            self._record(
-                                action="auto_scan",
-                                status="update_available",
-                                message="Update available; auto-update disabled",
-                                container=container.name,
-                                trigger="auto",
-                                details={"image": result.get("image"), "latest_id": result.get("latest_id")},
-                            )
+                    self._apply_result(container, result, auto_update, to_update)
                 except Exception as e:
                     logger.error(f"Error processing container {container.name}: {e}")
                     self._record(
@@ -163,12 +374,129 @@ class SchedulerService:
                         container=container.name,
                         trigger="auto",
                     )
-                    
+
+            # 4. Auto-update grouped by compose project: parallel pre-pull, then dependency-ordered recreates
+            if to_update and not run.cancelled:
+                outcomes = []
+
+                def on_update(container, result, update_res):
+                    self._apply_update(container, result, update_res)
+                    outcomes.append(bool(update_res.get("success")))
+                    self._publish(phase="updating", done=len(outcomes), total=len(to_update), container=container.name)
+
+                logger.info(f"Auto-updating {len(to_update)} containers...")
+                self._publish(phase="updating", done=0, total=len(to_update))
+                self.batch.run(to_update, listed, on_update, cancelled=lambda: run.cancelled)
+                summary["updated"] = sum(outcomes)
+
         except Exception as e:
             logger.error(f"Scan failed: {e}")
+        self.cache.flush()
+        summary["cancelled"] = run.cancelled
+        if run.cancelled and names is not None:
+            self._requeue({container.name for container in containers if container.id not in results})
+        # Checks now run in small due batches, so image GC runs after updates or once per default interval.
+        if cleanup and self.collector and not run.cancelled and (summary["updated"] or time.monotonic() - self._last_cleanup >= self.plan.default_interval()):
+            self._last_cleanup = time.monotonic()
+            summary["cleanup"] = self.collect_images()
+        summary["duration_seconds"] = round(time.monotonic() - started, 2)
+        if summary["checked"] or run.cancelled:
+            # One entry per scan carries every check latency, so stats cover up-to-date containers too.
+            latency = {
+                container.name: results[container.id]["duration_ms"]
+                for container in containers
+                if "duration_ms" in results.get(container.id, {})
+            }
+            if run.trigger == "due" and not run.cancelled:
+                self._roll_up_due(summary, latency)
+            else:
+                message = f"Checked {summary['checked']} containers, {summary['updates_available']} with updates"
+                self._record(
+                    action="auto_scan",
+                    status="cancelled" if run.cancelled else "completed",
+                    message=f"{message}; cancelled after {summary['duration_seconds']}s" if run.cancelled else message,
+                    trigger="auto",
+                    details={**summary, "scan_trigger": run.trigger, "check_latency_ms": latency},
+                )
+        self.last_scan_summary = summary
+        self._publish(phase="finished", summary=summary)
+        logger.info(f"Scan finished: {summary}")
         # Update next run time after completion
-        if self.job:
-            self.next_check_time = self.job.next_run_time.isoformat() if self.job.next_run_time else None
+        self._update_next_check()
+
+    def _roll_up_due(self, summary: dict, latency: dict):
+        """Fold a due batch into the running summary, recorded once a default interval has passed."""
+        with self._rollup_lock:
+            rollup = self._due_rollup
+            if rollup is None:
+                rollup = self._due_rollup = {"started": time.monotonic(), "batches": 0, "check_latency_ms": {}, **{key: 0 for key in ROLLUP_COUNTS}}
+            rollup["batches"] += 1
+            for key in ROLLUP_COUNTS:
+                rollup[key] += summary.get(key) or 0
+            # A container can be checked more than once per window; every sample is kept.
+            for name, duration_ms in latency.items():
+                rollup["check_latency_ms"].setdefault(name, []).append(duration_ms)
+            if time.monotonic() - rollup["started"] < self.plan.default_interval():
+                return
+            self._due_rollup = None
+        self._record_rollup(rollup)
+
+    def flush_due_summary(self):
+        """Record the due batches rolled up so far, e.g. at shutdown."""
+        with self._rollup_lock:
+            rollup, self._due_rollup = self._due_rollup, None
+        if rollup:
+            self._record_rollup(rollup)
+
+    def _record_rollup(self, rollup: dict):
+        window_seconds = round(time.monotonic() - rollup.pop("started"))
+        rollup["duration_seconds"] = round(rollup["duration_seconds"], 2)
+        self._record(
+            action="auto_scan",
+            status="completed",
+            message=f"Checked {rollup['checked']} containers in {rollup['batches']} due batches, {rollup['updates_available']} with updates",
+            trigger="auto",
+            details={**rollup, "scan_trigger": "due", "window_seconds": window_seconds},
+        )
+
+    def stop(self):
+        self.flush_due_summary()
+        self.scheduler.shutdown(wait=False)
+
+    def collect_images(self) -> Optional[dict]:
+        """Post-scan GC stage: remove superseded and dangling images and record what was reclaimed."""
+        self._publish(phase="cleanup")
+        try:
+            result = self.collector.collect()
+        except Exception as e:
+            logger.error(f"Image cleanup failed: {e}")
+            self._record(action="cleanup", status="error", message=str(e), trigger="auto")
+            return {"error": str(e)}
+        if result.get("removed") or result.get("failed"):
+            self._record(
+                action="cleanup",
+                status="completed",
+                message=f"Removed {result['removed']} images, reclaimed {result['bytes_reclaimed']} bytes",
+                trigger="auto",
+                details={key: result.get(key) for key in ("removed", "failed", "bytes_reclaimed", "pending", "images", "duration_seconds")},
+            )
+        return {key: result.get(key) for key in ("removed", "failed", "bytes_reclaimed", "pending", "skipped")}
+
+    def reap_retained(self):
+        """Remove previous containers kept for rollback once their grace period is over."""
+        try:
+            result = self.retained.reap()
+        except Exception as e:
+            logger.error(f"Removing expired previous containers failed: {e}")
+            return
+        if result["removed"] or result["failed"]:
+            self._record(
+                action="cleanup",
+                status="completed" if not result["failed"] else "error",
+                message=f"Removed {len(result['removed'])} expired previous containers",
+                trigger="auto",
+                details=result,
+            )
 
     def update_settings(self):
         """Called when settings change to reschedule job"""
@@ -179,4 +507,26 @@ class SchedulerService:
             "last_check_time": self.last_check_time,
             "next_check_time": self.next_check_time,
             "interval_minutes": self.settings.get("check_interval_minutes"),
+            "scan_concurrency": self.settings.get("scan_concurrency"),
+            "jitter_percent": self.settings.get("check_jitter_percent"),
+            "scheduled_containers": len(self.plan),
+            "upcoming": self.plan.upcoming(),
+            "adaptive": {
+                "enabled": bool(self.settings.get("adaptive_checks_enabled")),
+                "min_interval_minutes": self.settings.get("adaptive_min_interval_minutes"),
+                "max_interval_minutes": self.settings.get("adaptive_max_interval_minutes"),
+                "images": self.churn.snapshot(self.plan.default_interval()),
+            },
+            "last_scan": self.last_scan_summary,
+            "scan": self.scans.progress(),
+            "registry_quota": self.updater.registry.quota(),
+            "cleanup": {
+                "enabled": bool(self.settings.get("cleanup_enabled")),
+                "pending": self.collector.pending(),
+                "last_run": self.collector.last_run,
+            } if self.collector else None,
+            "retained": {
+                "enabled": bool(self.settings.get("retain_previous_container")),
+                "last_reap": self.retained.last_reap,
+            } if self.retained else None,
         }
@@ -8,8 +8,44 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_SETTINGS = {
     "check_interval_minutes": 60,
+    # Random spread added to every container's next check, as a percentage of its interval.
+    "check_jitter_percent": 10,
+    # Learn each image's change rate and check stable images less, busy ones more, within these bounds.
+    "adaptive_checks_enabled": True,
+    "adaptive_min_interval_minutes": 15,
+    "adaptive_max_interval_minutes": 1440,
     "auto_update_enabled": False,
     "cleanup_enabled": False,
+    # Image cleanup and retained-container removal work in batches of this size, pausing between batches.
+    "cleanup_batch_size": 10,
+    "cleanup_batch_delay_seconds": 2,
+    # Keep the previous container (stopped) after an update so it can be rolled back to.
+    "retain_previous_container": False,
+    "retain_previous_hours": 24,
+    # "digest" compares registry manifest digests without pulling; "pull" pulls and compares image IDs.
+    "check_mode": "digest",
+    "insecure_registries": [],
+    # Parallel check workers per scan, and the cap for any single registry.
+    "scan_concurrency": 4,
+    "registry_concurrency": 2,
+    # Compose projects (and standalone containers) updated at the same time by bulk and auto-updates.
+    "project_concurrency": 2,
+    # Requests held back from scans when a registry reports a low RateLimit-Remaining.
+    "registry_request_reserve": 10,
+    # How long a recreated container gets to become healthy (or stay running) before rollback.
+    "update_health_timeout_seconds": 60,
+    # Abort an image pull that reports no progress for this long.
+    "pull_stall_timeout_seconds": 120,
+    # Pulls run through one queue: this many at once, and no new pull starts while the
+    # measured pull throughput is at or over the budget (bytes per second, 0 = no budget).
+    "max_concurrent_pulls": 2,
+    "pull_bandwidth_budget_bps": 0,
+    # How long a cached update status stays fresh; 0 follows each container's check interval.
+    "status_cache_ttl_minutes": 0,
+    # History storage ("sqlite" or "jsonl"; read at startup) and retention by age and count.
+    "history_backend": "sqlite",
+    "history_retention_days": 90,
+    "history_max_entries": 100000,
     "excluded_containers": [
         "lighthouse-frontend",
         "lighthouse-backend",
@@ -95,13 +131,77 @@ class SettingsManager:
         self.settings["excluded_containers"] = cleaned
 
         # Normalize booleans that might come as strings from the UI
-        for boolean_key in ["notifications_enabled", "smtp_use_tls", "auto_update_enabled", "cleanup_enabled"]:
+        for boolean_key in ["notifications_enabled", "smtp_use_tls", "auto_update_enabled", "cleanup_enabled", "retain_previous_container", "adaptive_checks_enabled"]:
             value = self.settings.get(boolean_key)
             if isinstance(value, str):
                 self.settings[boolean_key] = value.lower() in ["true", "1", "yes", "on"]
             elif value is None:
                 self.settings[boolean_key] = DEFAULT_SETTINGS.get(boolean_key, False)
 
+        if self.settings.get("check_mode") not in ("digest", "pull"):
+            self.settings["check_mode"] = DEFAULT_SETTINGS["check_mode"]
+
+        for int_key in ["scan_concurrency", "registry_concurrency", "project_concurrency"]:
+            try:
+                self.settings[int_key] = max(1, int(self.settings.get(int_key)))
+            except (TypeError, ValueError):
+                self.settings[int_key] = DEFAULT_SETTINGS[int_key]
+
+        try:
+            self.settings["update_health_timeout_seconds"] = max(5, int(self.settings.get("update_health_timeout_seconds")))
+        except (TypeError, ValueError):
+            self.settings["update_health_timeout_seconds"] = DEFAULT_SETTINGS["update_health_timeout_seconds"]
+
+        try:
+            self.settings["pull_stall_timeout_seconds"] = max(10, int(self.settings.get("pull_stall_timeout_seconds")))
+        except (TypeError, ValueError):
+            self.settings["pull_stall_timeout_seconds"] = DEFAULT_SETTINGS["pull_stall_timeout_seconds"]
+
+        if self.settings.get("history_backend") not in ("sqlite", "jsonl"):
+            self.settings["history_backend"] = DEFAULT_SETTINGS["history_backend"]
+
+        # Retention days of 0 keeps entries regardless of age.
+        for int_key, minimum in [("history_retention_days", 0), ("history_max_entries", 100)]:
+            try:
+                self.settings[int_key] = max(minimum, int(self.settings.get(int_key)))
+            except (TypeError, ValueError):
+                self.settings[int_key] = DEFAULT_SETTINGS[int_key]
+
+        for int_key, minimum in [
+            ("max_concurrent_pulls", 1),
+            ("pull_bandwidth_budget_bps", 0),
+            ("cleanup_batch_size", 1),
+            ("cleanup_batch_delay_seconds", 0),
+            ("retain_previous_hours", 1),
+        ]:
+            try:
+                self.settings[int_key] = max(minimum, int(self.settings.get(int_key)))
+            except (TypeError, ValueError):
+                self.settings[int_key] = DEFAULT_SETTINGS[int_key]
+
+        for int_key in ["adaptive_min_interval_minutes", "adaptive_max_interval_minutes"]:
+            try:
+                self.settings[int_key] = max(1, int(self.settings.get(int_key)))
+            except (TypeError, ValueError):
+                self.settings[int_key] = DEFAULT_SETTINGS[int_key]
+        if self.settings["adaptive_max_interval_minutes"] < self.settings["adaptive_min_interval_minutes"]:
+            self.settings["adaptive_max_interval_minutes"] = self.settings["adaptive_min_interval_minutes"]
+
+        try:
+            self.settings["check_jitter_percent"] = min(50, max(0, int(self.settings.get("check_jitter_percent"))))
+        except (TypeError, ValueError):
+            self.settings["check_jitter_percent"] = DEFAULT_SETTINGS["check_jitter_percent"]
+
+        try:
+            self.settings["registry_request_reserve"] = max(0, int(self.settings.get("registry_request_reserve")))
+        except (TypeError, ValueError):
+            self.settings["registry_request_reserve"] = DEFAULT_SETTINGS["registry_request_reserve"]
+
+        insecure = self.settings.get("insecure_registries")
+        if not isinstance(insecure, list):
+            insecure = []
+        self.settings["insecure_registries"] = [h.strip() for h in insecure if isinstance(h, str) and h.strip()]
+
         # Ensure registry credential keys exist
         for key in ["dockerhub_username", "dockerhub_token", "ghcr_username", "ghcr_token"]:
             if key not in self.settings:
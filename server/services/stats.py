@@ -0,0 +1,200 @@
+import threading
+from datetime import datetime
+from typing import Optional
+
+# Statuses that are not an attempt to check or update (excluded from failure rates).
+PASSIVE_STATUSES = {"skipped", "deferred"}
+
+
+def _parse(timestamp: Optional[str]) -> Optional[datetime]:
+    if not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.rstrip("Z"))
+    except ValueError:
+        return None
+
+
+class HistoryStats:
+    """
+    Rolling aggregates over the history log, per container, per action and
+    per day. observe() is O(1) per entry and snapshot() is independent of the
+    history length, so stats never require a scan of the log. HistoryService
+    rebuilds them from the store at startup; entries removed later by retention
+    are subtracted again with forget().
+    """
+
+    def __init__(self, max_days: int = 90):
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._containers = {}
+            self._actions = {}
+            self._days = {}
+            self._total = 0
+
+    def _observe_latency(self, container: str, duration_ms):
+        # Caller holds the lock.
+        if not container or not isinstance(duration_ms, (int, float)):
+            return
+        bucket = self._container(container)
+        bucket["latency_total_ms"] += duration_ms
+        bucket["latency_samples"] += 1
+
+    def _container(self, name: str) -> dict:
+        bucket = self._containers.get(name)
+        if bucket is None:
+            bucket = self._containers[name] = {
+                "events": 0,
+                "attempts": 0,
+                "failures": 0,
+                "updates": 0,
+                "first_event": None,
+                "last_event": None,
+                "last_update": None,
+                "latency_total_ms": 0.0,
+                "latency_samples": 0,
+            }
+        return bucket
+
+    def observe(self, entry: dict):
+        status = entry.get("status")
+        action = entry.get("action") or "unknown"
+        timestamp = entry.get("timestamp")
+        details = entry.get("details") or {}
+        failed = status == "error"
+        updated = status == "updated"
+        with self._lock:
+            self._total += 1
+
+            counts = self._actions.setdefault(action, {"total": 0, "statuses": {}})
+            counts["total"] += 1
+            counts["statuses"][status] = counts["statuses"].get(status, 0) + 1
+
+            if timestamp:
+                day = self._days.get(timestamp[:10])
+                if day is None:
+                    day = self._days[timestamp[:10]] = {"events": 0, "updates": 0, "failures": 0}
+                    while len(self._days) > self.max_days:
+                        del self._days[min(self._days)]
+                day["events"] += 1
+                day["updates"] += updated
+                day["failures"] += failed
+
+            container = entry.get("container")
+            if container:
+                bucket = self._container(container)
+                bucket["events"] += 1
+                if status not in PASSIVE_STATUSES:
+                    bucket["attempts"] += 1
+                    bucket["failures"] += failed
+                if updated:
+                    bucket["updates"] += 1
+                    bucket["last_update"] = timestamp
+                bucket["first_event"] = bucket["first_event"] or timestamp
+                bucket["last_event"] = timestamp
+                self._observe_latency(container, details.get("duration_ms"))
+
+            # Scan summaries carry the check latency of every container they checked;
+            # rolled-up due batches carry a list of samples per container.
+            for name, samples in (details.get("check_latency_ms") or {}).items():
+                for duration_ms in samples if isinstance(samples, list) else [samples]:
+                    self._observe_latency(name, duration_ms)
+
+    def _forget_latency(self, container: str, duration_ms):
+        # Caller holds the lock.
+        bucket = self._containers.get(container)
+        if bucket is None or not isinstance(duration_ms, (int, float)) or not bucket["latency_samples"]:
+            return
+        bucket["latency_total_ms"] = max(0.0, bucket["latency_total_ms"] - duration_ms)
+        bucket["latency_samples"] -= 1
+
+    def forget(self, entry: dict):
+        """
+        Undo observe() for an entry retention removed. Retention removes the oldest
+        entries, so a container's first event moves up to the removed timestamp
+        (the exact next one is not known without a scan).
+        """
+        status = entry.get("status")
+        action = entry.get("action") or "unknown"
+        timestamp = entry.get("timestamp")
+        details = entry.get("details") or {}
+        failed = status == "error"
+        updated = status == "updated"
+        with self._lock:
+            self._total = max(0, self._total - 1)
+
+            counts = self._actions.get(action)
+            if counts:
+                counts["total"] -= 1
+                counts["statuses"][status] = counts["statuses"].get(status, 0) - 1
+                if counts["statuses"][status] <= 0:
+                    del counts["statuses"][status]
+                if counts["total"] <= 0:
+                    del self._actions[action]
+
+            day = self._days.get(timestamp[:10]) if timestamp else None
+            if day:
+                day["events"] -= 1
+                day["updates"] -= updated
+                day["failures"] -= failed
+                if day["events"] <= 0:
+                    del self._days[timestamp[:10]]
+
+            for name, samples in (details.get("check_latency_ms") or {}).items():
+                for duration_ms in samples if isinstance(samples, list) else [samples]:
+                    self._forget_latency(name, duration_ms)
+
+            container = entry.get("container")
+            bucket = self._containers.get(container) if container else None
+            if bucket:
+                bucket["events"] -= 1
+                if status not in PASSIVE_STATUSES:
+                    bucket["attempts"] -= 1
+                    bucket["failures"] -= failed
+                if updated:
+                    bucket["updates"] -= 1
+                    if not bucket["updates"]:
+                        bucket["last_update"] = None
+                if timestamp and bucket["first_event"] and bucket["first_event"] < timestamp:
+                    bucket["first_event"] = timestamp
+                self._forget_latency(container, details.get("duration_ms"))
+                if bucket["events"] <= 0:
+                    bucket["first_event"] = bucket["last_event"] = None
+                    if not bucket["latency_samples"]:
+                        del self._containers[container]
+
+    def snapshot(self) -> dict:
+        now = datetime.utcnow()
+        with self._lock:
+            containers = {name: dict(bucket) for name, bucket in self._containers.items()}
+            actions = {name: {"total": c["total"], "statuses": dict(c["statuses"])} for name, c in self._actions.items()}
+            days = [{"date": date, **counts} for date, counts in sorted(self._days.items())]
+            total = self._total
+
+        per_container = {}
+        for name, bucket in containers.items():
+            first = _parse(bucket["first_event"])
+            last_update = _parse(bucket["last_update"])
+            observed_days = max(1.0, (now - first).total_seconds() / 86400) if first else 1.0
+            per_container[name] = {
+                "events": bucket["events"],
+                "updates": bucket["updates"],
+                "failures": bucket["failures"],
+                "failure_rate": round(bucket["failures"] / bucket["attempts"], 4) if bucket["attempts"] else 0.0,
+                "updates_per_day": round(bucket["updates"] / observed_days, 4),
+                "last_update": bucket["last_update"],
+                "seconds_since_update": int((now - last_update).total_seconds()) if last_update else None,
+                "mean_check_ms": round(bucket["latency_total_ms"] / bucket["latency_samples"], 1) if bucket["latency_samples"] else None,
+                "last_event": bucket["last_event"],
+            }
+        return {
+            "generated_at": now.isoformat() + "Z",
+            "total_events": total,
+            "containers": per_container,
+            "actions": actions,
+            "days": days,
+        }
@@ -1,176 +1,453 @@
 import docker
 import logging
-from typing import Optional, Tuple
+import time
+from typing import Dict, List, Optional, Tuple
+
+from services.cache import ImageMetadataCache
+from services.cleanup import ImageCollector
+from services.pulls import PullMonitor
+from services.registry import ImageReference, RegistryClient, RegistryRateLimited, INDEX_MEDIA_TYPES, local_repo_digests
 
 logger = logging.getLogger(__name__)
 
+# A container without a healthcheck counts as ready once it has stayed running this long.
+READY_SETTLE_SECONDS = 2.0
+READY_POLL_SECONDS = 0.5
+
+
+def group_by_image(containers) -> Dict[str, List]:
+    """Group container objects by their configured image reference (Config.Image), keeping list order."""
+    groups: Dict[str, List] = {}
+    for container in containers:
+        groups.setdefault(container.attrs['Config']['Image'], []).append(container)
+    return groups
+
+
 class UpdateService:
-    def __init__(self, settings_manager):
+    def __init__(
+        self,
+        settings_manager,
+        image_cache: Optional[ImageMetadataCache] = None,
+        pull_monitor: Optional[PullMonitor] = None,
+        image_collector: Optional[ImageCollector] = None,
+    ):
         self.client = docker.from_env()
         self.settings = settings_manager
-        # Remember the last successful auth attempt to avoid re-authing on every pull
-        self._auth_cache = {}
+        self.registry = RegistryClient(settings_manager)
+        self.images = image_cache or ImageMetadataCache(self.client)
+        self.pulls = pull_monitor or PullMonitor(self.client, settings_manager)
+        # Told about every image an update replaces, for cleanup_enabled.
+        self.collector = image_collector
 
-    def _detect_registry(self, image_name: str) -> Tuple[Optional[str], Optional[str]]:
+    def _registry_auth(self, image_name: str) -> Tuple[Optional[dict], Optional[str]]:
         """
-        Identify which registry provider/URL to use for auth based on the image reference.
-        Returns (provider_key, registry_url) or (None, None) if not handled.
+        Credentials for pulling a Docker Hub or GHCR image when they are configured.
+        Credentials are validated through the registry client's shared token cache
+        (one handshake per registry/scope until the token expires) and passed to the
+        daemon per pull, so switching registries never re-runs `docker login`.
+        Returns (auth_config, warning); on failure auth_config is None and the pull
+        continues anonymously.
         """
-        parts = image_name.split("/")
-        registry_hint = parts[0].lower() if parts else ""
+        try:
+            ref = ImageReference.parse(image_name)
+        except Exception:
+            return None, None
+        credentials = self.registry.credentials(ref)
+        if not credentials:
+            return None, None
 
-        if registry_hint in {"ghcr.io"}:
-            return "ghcr", "ghcr.io"
+        try:
+            self.registry.authenticate(ref)
+            return {"username": credentials[0], "password": credentials[1]}, None
+        except Exception as e:
+            logger.warning(f"Registry authentication failed for {ref.domain}: {e}. Proceeding without credentials.")
+            return None, f"Registry authentication failed for {ref.domain}: {e}. Pulled anonymously."
 
-        if registry_hint in {"docker.io", "index.docker.io"}:
-            return "dockerhub", "https://index.docker.io/v1/"
+    def resolve_image(self, image_name: str, containers: Optional[List[str]] = None, priority: str = "scan") -> dict:
+        """
+        Look up the newest version of an image reference. The returned lookup is
+        shared by every container running that reference, so each reference costs
+        one registry round-trip per scan. Digest mode queries the manifest; pull mode
+        (or a failed digest lookup) pulls the image. A rate-limited registry defers
+        the check instead: a pull would hit the same registry. `containers` names the
+        containers using it, for pull progress reporting, and `priority` is the
+        pull queue class used if a pull is needed.
+        """
+        lookup = {"image": image_name, "platform_digests": {}, "priority": priority}
+        if (self.settings.get("check_mode") or "digest") == "digest":
+            try:
+                ref = ImageReference.parse(image_name)
+                lookup.update(check_mode="digest", ref=ref)
+                if ref.digest:
+                    # Pinned by digest: the reference can never move.
+                    lookup.update(latest_digest=ref.digest, pinned=True)
+                    return lookup
+                lookup["latest_digest"], lookup["media_type"] = self.registry.get_manifest_digest(ref)
+                return lookup
+            except RegistryRateLimited as e:
+                logger.warning(f"Digest check for {image_name} deferred: {e}")
+                lookup.update(deferred=True, error=f"{e}; check deferred")
+                return lookup
+            except Exception as e:
+                logger.warning(f"Digest check failed for {image_name}: {e}. Falling back to pull.")
+        lookup["containers"] = containers
+        return self._resolve_by_pull(image_name, lookup)
 
-        # If no registry host is present (no dot/colon), default to Docker Hub.
-        if not (registry_hint and any(ch in registry_hint for ch in [".", ":"])):  # e.g. nginx or user/image
-            return "dockerhub", "https://index.docker.io/v1/"
+    def _resolve_by_pull(self, image_name: str, lookup: dict) -> dict:
+        # Authenticate before pulling private images
+        auth_config, auth_error = self._registry_auth(image_name)
+        logger.info(f"Pulling {image_name} to compare image IDs...")
+        try:
+            pulled_image = self.pulls.pull(image_name, auth_config=auth_config, containers=lookup.get("containers"), priority=lookup.get("priority") or "scan")
+            self.registry.note_pull(image_name)
+            self.images.forget_tag(image_name)
+        except Exception as e:
+            logger.error(f"Failed to pull image {image_name}: {e}")
+            lookup["error"] = f"Failed to pull image: {str(e)}"
+            return lookup
+        lookup.update(check_mode="pull", latest_id=pulled_image.id)
+        if auth_error:
+            lookup["auth_warning"] = auth_error
+        return lookup
 
-        # Unknown/unsupported registry host (e.g. quay.io); let Docker handle it without custom auth.
-        return None, None
+    def _compare(self, image: dict, lookup: dict) -> dict:
+        """Decide whether a local image (cached inspect data) is behind a resolved lookup."""
+        if lookup.get("deferred"):
+            return {"error": lookup["error"], "deferred": True, "reason": lookup["error"], "update_available": False}
+        if lookup.get("error"):
+            return {"error": lookup["error"], "update_available": False}
 
-    def _ensure_registry_auth(self, image_name: str) -> Optional[str]:
-        """
-        Log in to Docker Hub or GHCR when credentials are configured.
-        Returns an error string if auth fails, otherwise None. We log but still allow anonymous pull to continue.
-        """
-        provider, registry_url = self._detect_registry(image_name)
-        if not provider or not registry_url:
-            return None
+        if lookup["check_mode"] == "pull":
+            return {
+                "check_mode": "pull",
+                "update_available": lookup["latest_id"] != image["Id"],
+                "latest_id": lookup["latest_id"],
+            }
 
-        username = self.settings.get(f"{provider}_username")
-        token = self.settings.get(f"{provider}_token")
-        if not username or not token:
-            return None
+        ref = lookup["ref"]
+        remote_digest = lookup["latest_digest"]
+        local_digests = local_repo_digests(image.get('RepoDigests'), ref)
+        result = {
+            "check_mode": "digest",
+            "current_digest": local_digests[0] if local_digests else None,
+            "latest_digest": remote_digest,
+        }
+        if lookup.get("pinned") or remote_digest in local_digests:
+            return {**result, "update_available": False}
 
-        cache_key = (provider, username, token, registry_url)
-        if self._auth_cache.get(cache_key):
-            return None
+        if not local_digests:
+            # Locally built or loaded images have no RepoDigests to compare against;
+            # pull once for the whole group and compare image IDs instead.
+            if "pull_lookup" not in lookup:
+                lookup["pull_lookup"] = self._resolve_by_pull(
+                    lookup["image"],
+                    {"image": lookup["image"], "containers": lookup.get("containers"), "priority": lookup.get("priority")},
+                )
+            return self._compare(image, lookup["pull_lookup"])
 
-        try:
-            logger.info(f"Authenticating to {registry_url} for {provider} images")
-            self.client.login(username=username, password=token, registry=registry_url)
-            self._auth_cache = {cache_key: True}
-            return None
-        except Exception as e:
-            logger.warning(f"Registry authentication failed for {registry_url}: {e}. Proceeding without credentials.")
-            return f"Registry authentication failed for {registry_url}: {e}. Pulled anonymously."
+        # Multi-arch images: some daemons record the platform manifest digest
+        # instead of the index digest, so resolve ours before reporting an update.
+        if lookup.get("media_type") in INDEX_MEDIA_TYPES:
+            platform = (image.get('Os') or "linux", image.get('Architecture') or "amd64", image.get('Variant'))
+            if platform not in lookup["platform_digests"]:
+                lookup["platform_digests"][platform] = self.registry.get_platform_digest(ref, remote_digest, *platform)
+            if lookup["platform_digests"][platform] in local_digests:
+                return {**result, "update_available": False}
+
+        return {**result, "update_available": True}
 
-    def check_for_update(self, container_id: str) -> dict:
+    def check_container(self, container, lookup: Optional[dict] = None, priority: str = "scan") -> dict:
         """
-        Checks if a newer image exists for the container.
-        Returns dict with update available status and details.
+        Check a container object against a lookup from resolve_image(), resolving
+        its image reference first when no lookup is supplied.
         """
         try:
-            container = self.client.containers.get(container_id)
             image_name = container.attrs['Config']['Image']
-            current_image_id = container.image.id
-
-            # Ensure we are authenticated before pulling private images
-            auth_error = self._ensure_registry_auth(image_name)
-
-            # Get current image details
-            created_date = container.image.attrs.get('Created')
-
-            # Pull the latest version of the image
             logger.info(f"Checking update for {container.name} ({image_name})...")
-            try:
-                # This pulls the image.
-                pulled_image = self.client.images.pull(image_name)
-            except Exception as e:
-                logger.error(f"Failed to pull image {image_name}: {e}")
-                return {"error": f"Failed to pull image: {str(e)}", "update_available": False}
-
-            pulled_image_id = pulled_image.id
+            if lookup is None:
+                lookup = self.resolve_image(image_name, containers=[container.name], priority=priority)
 
+            image = self.images.get(container.attrs['Image'])
+            check = self._compare(image, lookup)
+            if check.get("error"):
+                return check
             result = {
-                "update_available": pulled_image_id != current_image_id,
-                "current_id": current_image_id,
-                "latest_id": pulled_image_id,
+                "current_id": image["Id"],
                 "image": image_name,
-                "created": created_date
+                "created": image.get('Created'),
+                **check,
             }
+            auth_error = lookup.get("auth_warning") or lookup.get("pull_lookup", {}).get("auth_warning")
             if auth_error:
                 result["auth_warning"] = auth_error
             return result
+        except Exception as e:
+            return {"error": str(e), "update_available": False}
 
+    def check_for_update(self, container_id: str, lookup: Optional[dict] = None, priority: str = "manual") -> dict:
+        """
+        Checks if a newer image exists for the container.
+        In "digest" mode (default) only the registry manifest is queried; the
+        image is pulled when the update is applied. "pull" mode pulls and compares image IDs.
+        Returns dict with update available status and details.
+        """
+        try:
+            container = self.client.containers.get(container_id)
         except docker.errors.NotFound:
             return {"error": "Container not found", "update_available": False}
         except Exception as e:
             return {"error": str(e), "update_available": False}
+        return self.check_container(container, lookup, priority=priority)
+
+    def pull_image(self, image_name: str, containers: Optional[List[str]] = None, priority: str = "update", cancelled=None) -> Optional[str]:
+        """
+        Pull the newest image for a reference ahead of an update; returns an auth
+        warning, if any. `cancelled` lets a batch abandon the pull while it is queued.
+        """
+        # Authenticate before pulling to support private registries
+        auth_config, auth_error = self._registry_auth(image_name)
+        self.pulls.pull(image_name, auth_config=auth_config, containers=containers, priority=priority, cancelled=cancelled)
+        self.registry.note_pull(image_name)
+        self.images.forget_tag(image_name)
+        return auth_error
 
-    def update_container(self, container_id: str):
+    def _ready_timeout(self) -> float:
+        return float(self.settings.get("update_health_timeout_seconds") or 60)
+
+    def _wait_ready(self, container, timeout: float) -> float:
         """
-        Recreates the container with the new image.
+        Wait until a started container is healthy (when it has a healthcheck) or
+        running and still up after READY_SETTLE_SECONDS. Returns the monotonic
+        time it first became ready; raises when it exits, turns unhealthy or
+        times out.
+        """
+        deadline = time.monotonic() + timeout
+        ready_at = None
+        while True:
+            container.reload()
+            state = container.attrs.get("State") or {}
+            health = (state.get("Health") or {}).get("Status")
+            if state.get("Status") in ("exited", "dead"):
+                raise RuntimeError(f"New container exited with code {state.get('ExitCode')}")
+            if health == "unhealthy":
+                raise RuntimeError("New container reported unhealthy")
+            if health == "healthy":
+                return time.monotonic()
+            if not health and state.get("Running") and not state.get("Restarting"):
+                ready_at = ready_at or time.monotonic()
+                if time.monotonic() - ready_at >= READY_SETTLE_SECONDS:
+                    return ready_at
+            elif not health:
+                ready_at = None
+            if time.monotonic() >= deadline:
+                waited_for = "healthy" if health else "running"
+                raise TimeoutError(f"New container was not {waited_for} within {int(timeout)}s")
+            time.sleep(READY_POLL_SECONDS)
+
+    def _rollback(self, old_container, new_container, container_name: str, renamed: bool, was_running: bool = True) -> bool:
+        """Put the previous container back under its name, and start it again if it was running."""
+        try:
+            if new_container is not None:
+                try:
+                    new_container.remove(force=True)
+                except docker.errors.NotFound:
+                    pass
+            if renamed:
+                old_container.rename(container_name)
+            if was_running:
+                old_container.start()
+            logger.info(f"Rolled back {container_name} to its previous container")
+            return True
+        except Exception as e:
+            logger.error(f"Rollback of {container_name} failed: {e}")
+            return False
+
+    def update_container(self, container_id: str, pull: bool = True, priority: str = "manual"):
+        """
+        Recreates the container with the new image, create-before-stop: the new
+        container is pulled and created under a staging name while the old one
+        keeps serving, so downtime is only stop + start + readiness. If the new
+        container fails to start or become ready, the old one is restored.
+        A container that was not running is swapped without being started.
+        Pass pull=False when the image was already pulled in this batch;
+        `priority` is the pull queue class otherwise.
         """
         try:
             old_container = self.client.containers.get(container_id)
             container_name = old_container.name
+            # Stopped (or one-shot) containers are swapped but left stopped.
+            was_running = bool((old_container.attrs.get('State') or {}).get('Running'))
             image_name = old_container.attrs['Config']['Image']
-
-            # Authenticate before pulling to support private registries
-            auth_error = self._ensure_registry_auth(image_name)
+            auth_error = None
 
             # 1. Pull latest image
-            logger.info(f"Pulling latest image for {container_name}...")
-            self.client.images.pull(image_name)
-            
+            if pull:
+                logger.info(f"Pulling latest image for {container_name}...")
+                auth_error = self.pull_image(image_name, containers=[container_name], priority=priority)
+
             # 2. Capture configuration
             config = old_container.attrs['Config']
             host_config = old_container.attrs['HostConfig']
-            
-            # Map ports: ExposedPorts -> PortBindings
-            # Actually, HostConfig.PortBindings is what we want to preserve?
-            # Yes, usually we want to keep the same external ports.
+
+            # Keep the same external ports (HostConfig.PortBindings)
             ports = host_config.get('PortBindings')
-            
-            # Volumes
             binds = host_config.get('Binds')
-            
-            # Environment
             env = config.get('Env')
-            
-            # Network
             # If on user defined network, we need to reconnect.
-            # HostConfig.NetworkMode
             network_mode = host_config.get('NetworkMode')
-            
-            # Restart Policy
             restart_policy = host_config.get('RestartPolicy')
-            
-            logger.info(f"Stopping {container_name}...")
-            old_container.stop()
-            
-            logger.info(f"Renaming old container {container_name}...")
-            old_container.rename(f"{container_name}_old_{old_container.short_id}")
-            
-            logger.info(f"Creating new container {container_name}...")
-            new_container = self.client.containers.run(
+            labels = config.get('Labels') or {}
+
+            # 3. Create the replacement up front; ports are only bound on start.
+            logger.info(f"Creating new container for {container_name}...")
+            new_container = self.client.containers.create(
                 image_name,
-                name=container_name,
-                detach=True,
+                name=f"{container_name}_new_{old_container.short_id}",
                 ports=ports,
                 environment=env,
                 volumes=binds,
                 network_mode=network_mode,
                 restart_policy=restart_policy,
+                # Compose project/service/depends_on and lighthouse.* labels drive
+                # batch grouping, dependency order and per-container intervals.
+                labels=labels,
                 # Add other critical configs as needed (e.g. entrypoint, cmd if overridden)
                 # For now, assuming basic usage.
             )
-            
-            logger.info(f"Removing old container...")
-            old_container.remove()
-            
+        except Exception as e:
+            logger.error(f"Update failed: {e}")
+            return {"success": False, "error": str(e)}
+
+        # 4. Swap: stop old, start new, wait for readiness. Downtime starts at the stop.
+        # rename() does not refresh old_container.name, so the new name is kept here.
+        retained_as = f"{container_name}_old_{old_container.short_id}"
+        downtime_started = time.monotonic()
+        renamed = False
+        try:
+            if was_running:
+                logger.info(f"Stopping {container_name}...")
+                old_container.stop()
+            old_container.rename(retained_as)
+            renamed = True
+            new_container.rename(container_name)
+            if was_running:
+                logger.info(f"Starting new container {container_name}...")
+                new_container.start()
+                ready_at = self._wait_ready(new_container, self._ready_timeout())
+            else:
+                logger.info(f"{container_name} was not running; leaving the new container stopped")
+                ready_at = downtime_started
+        except Exception as e:
+            downtime_ms = round((time.monotonic() - downtime_started) * 1000)
+            logger.error(f"Update of {container_name} failed, rolling back: {e}")
+            rolled_back = self._rollback(old_container, new_container, container_name, renamed, was_running)
             return {
-                "success": True,
-                "new_id": new_container.id,
-                "message": f"Successfully updated {container_name}",
-                **({"auth_warning": auth_error} if auth_error else {}),
+                "success": False,
+                "error": f"{e} ({'rolled back to the previous container' if rolled_back else 'rollback failed'})",
+                "rolled_back": rolled_back,
+                "downtime_ms": downtime_ms,
             }
+        downtime_ms = round((ready_at - downtime_started) * 1000)
 
+        retained = None
+        if self.settings.get("retain_previous_container"):
+            # Stays stopped under its _old_ name until rolled back to or reaped. Without
+            # this, an "always"/"unless-stopped" policy would bring it back next to
+            # the new container on a daemon restart. The new container carries the
+            # original policy, so rollback_container restores it from there.
+            retained = retained_as
+            try:
+                old_container.update(restart_policy={"Name": "no"})
+            except Exception as e:
+                logger.warning(f"Failed to clear the restart policy of {retained}: {e}")
+            logger.info(f"Keeping previous container as {retained}")
+        else:
+            logger.info(f"Removing old container...")
+            try:
+                old_container.remove()
+            except Exception as e:
+                logger.warning(f"Failed to remove old container for {container_name}: {e}")
+
+        old_image_id = old_container.attrs.get('Image')
+        if self.collector and old_image_id and old_image_id != new_container.attrs.get('Image'):
+            self.collector.track(old_image_id, image_name)
+
+        return {
+            "success": True,
+            "new_id": new_container.id,
+            "message": f"Successfully updated {container_name}",
+            "downtime_ms": downtime_ms,
+            **({"retained": retained} if retained else {}),
+            **({"auth_warning": auth_error} if auth_error else {}),
+        }
+
+    def rollback_container(self, container_id: str, previous_id: str) -> dict:
+        """
+        Swap a retained previous container back in for the current one. No
+        registry access is needed: the previous container and its image are
+        still on the host. The current container is removed once the previous
+        one is ready; if it does not become ready, the current one is restored.
+        The rolled back image usually still carries the tag, so it is left for
+        image cleanup to find once it is dangling. The previous container takes
+        over the current one's restart policy, which was cleared while retained.
+        """
+        try:
+            current = self.client.containers.get(container_id)
+            previous = self.client.containers.get(previous_id)
+        except docker.errors.NotFound:
+            return {"success": False, "error": "Container not found"}
         except Exception as e:
-            logger.error(f"Update failed: {e}")
             return {"success": False, "error": str(e)}
+        container_name = current.name
+        retained_name = previous.name
+        was_running = bool((current.attrs.get('State') or {}).get('Running'))
+        restart_policy = current.attrs.get('HostConfig', {}).get('RestartPolicy') or {"Name": "no"}
+
+        downtime_started = time.monotonic()
+        swapped = False
+        try:
+            logger.info(f"Rolling back {container_name} to {retained_name}...")
+            if was_running:
+                current.stop()
+            current.rename(f"{container_name}_rollback_{current.short_id}")
+            previous.rename(container_name)
+            swapped = True
+            previous.update(restart_policy=restart_policy)
+            ready_at = downtime_started
+            if was_running:
+                previous.start()
+                ready_at = self._wait_ready(previous, self._ready_timeout())
+        except Exception as e:
+            downtime_ms = round((time.monotonic() - downtime_started) * 1000)
+            logger.error(f"Rollback of {container_name} failed, restoring current container: {e}")
+            try:
+                if swapped:
+                    previous.stop()
+                    previous.update(restart_policy={"Name": "no"})
+                    previous.rename(retained_name)
+                current.rename(container_name)
+                if was_running:
+                    current.start()
+                restored = True
+            except Exception as restore_error:
+                logger.error(f"Restoring {container_name} failed: {restore_error}")
+                restored = False
+            return {
+                "success": False,
+                "error": f"{e} ({'current container restored' if restored else 'restore failed'})",
+                "restored": restored,
+                "downtime_ms": downtime_ms,
+            }
+        downtime_ms = round((ready_at - downtime_started) * 1000)
+
+        try:
+            current.remove()
+        except Exception as e:
+            logger.warning(f"Failed to remove rolled back container for {container_name}: {e}")
+
+        return {
+            "success": True,
+            "new_id": previous.id,
+            "message": f"Rolled back {container_name} to its previous container",
+            "downtime_ms": downtime_ms,
+        }